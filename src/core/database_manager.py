@@ -3,6 +3,8 @@
 """
 import sqlite3
 import json
+import threading
+from functools import wraps
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
@@ -10,6 +12,24 @@ from src.utils.logger import get_logger
 
 logger = get_logger("database_manager")
 
+_DOMAIN_INSERT_KEYS = ['domain_name', 'server_id', 'ftp_user', 'ftp_password', 'cloudflare_status', 'cloudflare_ns', 'purchase_date', 'renewal_date', 'registrar', 'backup_enabled', 'backup_frequency', 'notes', 'wordpress_installed']
+_DOMAIN_INSERT_SQL = """
+    INSERT INTO domains (domain_name, server_id, ftp_user, ftp_password, cloudflare_status, cloudflare_ns, purchase_date, renewal_date, registrar, backup_enabled, backup_frequency, notes, wordpress_installed)
+    VALUES (:domain_name, :server_id, :ftp_user, :ftp_password, :cloudflare_status, :cloudflare_ns, :purchase_date, :renewal_date, :registrar, :backup_enabled, :backup_frequency, :notes, :wordpress_installed)
+"""
+# Ограничение SQLite на число параметров в одном запросе (SQLITE_MAX_VARIABLE_NUMBER в старых сборках)
+_SQL_PARAMS_CHUNK = 900
+
+
+def _synchronized(method):
+    """Сериализует обращения к общему соединению SQLite из разных потоков."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class DatabaseManager:
     """Класс для управления всеми операциями с базой данных SQLite."""
 
@@ -20,8 +40,13 @@ class DatabaseManager:
         """
         db_path.parent.mkdir(exist_ok=True)
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
+        # Соединение используется и UI-потоком, и фоновым потоком записи
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row  # Для доступа к столбцам по имени
+        # WAL: чтение не ждет записи; NORMAL безопасен в режиме WAL и не делает fsync на каждый коммит
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
         self.cursor = self.conn.cursor()
         self._create_tables()
 
@@ -50,6 +75,9 @@ class DatabaseManager:
             )
             """)
 
+            # Индекс под сортировку списка серверов (новые первыми)
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_servers_created_at ON servers(created_at DESC)")
+
             # Таблица доменов (с новыми полями)
             self.cursor.execute("""
             CREATE TABLE IF NOT EXISTS domains (
@@ -149,11 +177,13 @@ class DatabaseManager:
 
     # --- Методы для работы с серверами ---
 
+    @_synchronized
     def get_all_servers(self) -> List[Dict[str, Any]]:
         """Возвращает список всех серверов."""
         self.cursor.execute("SELECT * FROM servers ORDER BY created_at DESC")
         return [dict(row) for row in self.cursor.fetchall()]
 
+    @_synchronized
     def add_server(self, server_data: Dict[str, Any]) -> bool:
         """Добавляет новый сервер в БД."""
         try:
@@ -179,6 +209,7 @@ class DatabaseManager:
             return False
 
 
+    @_synchronized
     def update_server(self, server_id: str, server_data: Dict[str, Any]):
         """Обновляет данные сервера."""
         # Преобразуем bool в int для fastpanel_installed, если оно есть
@@ -195,6 +226,7 @@ class DatabaseManager:
         self.conn.commit()
 
 
+    @_synchronized
     def delete_server(self, server_id: str):
         """Удаляет сервер по ID."""
         self.cursor.execute("DELETE FROM servers WHERE id = ?", (server_id,))
@@ -203,32 +235,52 @@ class DatabaseManager:
 
     # --- Методы для работы с доменами ---
 
+    @_synchronized
     def get_all_domains(self) -> List[Dict[str, Any]]:
         """Возвращает список всех доменов."""
         self.cursor.execute("SELECT * FROM domains")
         return [dict(row) for row in self.cursor.fetchall()]
 
+    @_synchronized
     def add_domain(self, domain_data: Dict[str, Any]) -> bool:
         """Добавляет новый домен."""
         try:
-            # Убедимся, что все поля существуют, иначе None
-            keys = ['domain_name', 'server_id', 'ftp_user', 'ftp_password', 'cloudflare_status', 'cloudflare_ns', 'purchase_date', 'renewal_date', 'registrar', 'backup_enabled', 'backup_frequency', 'notes', 'wordpress_installed']
-            for key in keys:
-                domain_data.setdefault(key, None)
-
-            if isinstance(domain_data.get('cloudflare_ns'), list):
-                 domain_data['cloudflare_ns'] = ",".join(domain_data.get('cloudflare_ns'))
-
-            self.cursor.execute("""
-                INSERT INTO domains (domain_name, server_id, ftp_user, ftp_password, cloudflare_status, cloudflare_ns, purchase_date, renewal_date, registrar, backup_enabled, backup_frequency, notes, wordpress_installed)
-                VALUES (:domain_name, :server_id, :ftp_user, :ftp_password, :cloudflare_status, :cloudflare_ns, :purchase_date, :renewal_date, :registrar, :backup_enabled, :backup_frequency, :notes, :wordpress_installed)
-            """, domain_data)
+            self._fill_domain_defaults(domain_data)
+            self.cursor.execute(_DOMAIN_INSERT_SQL, domain_data)
             self.conn.commit()
             return True
         except sqlite3.IntegrityError:
             logger.warning(f"Домен {domain_data.get('domain_name')} уже существует.")
             return False
 
+    @_synchronized
+    def add_domains_bulk(self, domains: List[Dict[str, Any]]) -> List[str]:
+        """Добавляет домены одной транзакцией, пропуская уже существующие. Возвращает имена добавленных."""
+        names = list(dict.fromkeys(d['domain_name'] for d in domains))
+        existing = set()
+        for i in range(0, len(names), _SQL_PARAMS_CHUNK):
+            chunk = names[i:i + _SQL_PARAMS_CHUNK]
+            rows = self.conn.execute(f"SELECT domain_name FROM domains WHERE domain_name IN ({','.join('?' * len(chunk))})", chunk)
+            existing.update(row['domain_name'] for row in rows)
+        new_domains, added = [], set(existing)
+        for domain_data in domains:
+            if domain_data['domain_name'] in added: continue
+            added.add(domain_data['domain_name'])
+            new_domains.append(self._fill_domain_defaults(domain_data))
+        with self.conn:
+            self.conn.executemany(_DOMAIN_INSERT_SQL, new_domains)
+        return [d['domain_name'] for d in new_domains]
+
+    @staticmethod
+    def _fill_domain_defaults(domain_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Дополняет domain_data недостающими полями (None), как у строки из БД."""
+        for key in _DOMAIN_INSERT_KEYS:
+            domain_data.setdefault(key, None)
+        if isinstance(domain_data.get('cloudflare_ns'), list):
+            domain_data['cloudflare_ns'] = ",".join(domain_data.get('cloudflare_ns'))
+        return domain_data
+
+    @_synchronized
     def update_domain(self, domain_name: str, domain_data: Dict[str, Any]):
         """Обновляет данные домена."""
         if 'cloudflare_ns' in domain_data and isinstance(domain_data['cloudflare_ns'], list):
@@ -243,19 +295,45 @@ class DatabaseManager:
         self.cursor.execute(query, params)
         self.conn.commit()
 
+    @_synchronized
+    def update_domains_bulk(self, updates: Dict[str, Dict[str, Any]]):
+        """Обновляет несколько доменов одной транзакцией (domain_name -> изменяемые поля)."""
+        # Строки с одинаковым набором полей пишутся одним executemany
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for domain_name, domain_data in updates.items():
+            params = dict(domain_data)
+            if isinstance(params.get('cloudflare_ns'), list):
+                params['cloudflare_ns'] = ",".join(params['cloudflare_ns'])
+            params['domain_name'] = domain_name
+            groups.setdefault(tuple(key for key in params if key != 'domain_name'), []).append(params)
+        with self.conn:
+            for keys, rows in groups.items():
+                if not keys: continue
+                fields = ", ".join(f"{key} = :{key}" for key in keys)
+                self.conn.executemany(f"UPDATE domains SET {fields} WHERE domain_name = :domain_name", rows)
+
+    @_synchronized
     def delete_domain(self, domain_name: str):
         """Удаляет домен по имени."""
         self.cursor.execute("DELETE FROM domains WHERE domain_name = ?", (domain_name,))
         self.conn.commit()
 
+    @_synchronized
+    def delete_domains_bulk(self, domain_names: List[str]):
+        """Удаляет несколько доменов одной транзакцией."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM domains WHERE domain_name = ?", [(name,) for name in domain_names])
+
     # --- Методы для работы с настройками ---
 
+    @_synchronized
     def get_setting(self, key: str, default: Any = None) -> Optional[str]:
         """Получает значение настройки по ключу."""
         self.cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
         row = self.cursor.fetchone()
         return row['value'] if row else default
 
+    @_synchronized
     def get_all_settings(self) -> Dict[str, Any]:
         """Возвращает все настройки в виде словаря."""
         self.cursor.execute("SELECT key, value FROM settings")
@@ -268,6 +346,7 @@ class DatabaseManager:
                 settings[row['key']] = row['value']
         return settings
 
+    @_synchronized
     def save_setting(self, key: str, value: Any):
         """Сохраняет или обновляет значение настройки."""
         # Если значение - словарь или список, сохраняем как JSON строку
@@ -280,6 +359,20 @@ class DatabaseManager:
         """, (key, value))
         self.conn.commit()
 
+    @_synchronized
+    def save_settings_bulk(self, settings: Dict[str, Any]):
+        """Сохраняет несколько настроек одной транзакцией."""
+        rows = [
+            (key, json.dumps(value) if isinstance(value, (dict, list)) else value)
+            for key, value in settings.items()
+        ]
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO settings (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, rows)
+
+    @_synchronized
     def close(self):
         """Закрывает соединение с БД."""
         if self.conn:
@@ -27,13 +27,18 @@ class SSHManager:
         self.client: Optional[paramiko.SSHClient] = None
         self.connected = False
         self.current_host = None
+        self._target = None
 
     def connect(self, host: str, username: str = "root",
                 password: Optional[str] = None, port: int = 22,
-                timeout: int = 30) -> bool:
+                timeout: int = 30, keepalive: int = 30) -> bool:
         """
-        Подключение к серверу по SSH
+        Подключение к серверу по SSH; живое соединение с тем же сервером и пользователем переиспользуется
         """
+        # Пароль в ключ не входит: живое соединение уже аутентифицировано, и смена пароля
+        # на сервере не разрывает его - новый пароль проверяется только при переподключении
+        if self.is_connected_to(host, username, port):
+            return True
         try:
             if self.client:
                 self.disconnect()
@@ -52,9 +57,13 @@ class SSHManager:
                 allow_agent=False,
                 look_for_keys=False
             )
+            # Keepalive не дает NAT/серверу закрыть простаивающее соединение из пула
+            if keepalive:
+                self.client.get_transport().set_keepalive(keepalive)
 
             self.connected = True
             self.current_host = host
+            self._target = (host, port, username)
             logger.info(f"Успешное подключение к {host}")
             return True
 
@@ -68,6 +77,21 @@ class SSHManager:
             logger.error(f"Неожиданная ошибка при подключении к {host}: {e}")
             return False
 
+    def is_connected_to(self, host: str, username: str = "root", port: int = 22) -> bool:
+        """
+        Проверка, что живое соединение открыто именно к этому серверу под этим пользователем
+        """
+        return self._target == (host, port, username) and self.is_active()
+
+    def is_active(self) -> bool:
+        """
+        Проверка, что SSH транспорт еще жив
+        """
+        if not self.connected or not self.client:
+            return False
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
     def execute(self, command: str, get_pty: bool = False,
                 timeout: Optional[int] = None) -> SSHResult:
         """
@@ -157,6 +181,7 @@ class SSHManager:
             finally:
                 self.client = None
                 self.connected = False
+                self._target = None
                 self.current_host = None
     
     def __enter__(self):
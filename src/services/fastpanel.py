@@ -8,6 +8,7 @@ from typing import Dict, Optional, Any, Callable
 from dataclasses import dataclass
 from datetime import datetime
 import logging
+import threading
 import time
 
 from src.core.ssh_manager import SSHManager
@@ -16,6 +17,20 @@ from src.config import config
 
 logger = get_logger("fastpanel")
 
+# certbot (за certificates create-le) держит глобальную блокировку и не допускает параллельного
+# запуска на одном сервере: блокировка на хост, общая для всех сервисов и соединений
+_certbot_locks: Dict[str, threading.Lock] = {}
+_certbot_locks_guard = threading.Lock()
+
+
+def _certbot_lock(host: Optional[str]) -> threading.Lock:
+    with _certbot_locks_guard:
+        return _certbot_locks.setdefault(host, threading.Lock())
+
+
+# Значение по умолчанию FastPanelService.configure: параметр не передан и не меняется
+_UNCHANGED = object()
+
 
 def generate_password(length=12):
     """Генерирует надежный пароль."""
@@ -41,6 +56,17 @@ class FastPanelService:
         self.fastpanel_path_override = fastpanel_path
         self.fastpanel_path = None
 
+    def configure(self, ssh_manager: SSHManager = None, fastpanel_path: Any = _UNCHANGED):
+        """Обновляет параметры сервиса без пересоздания; не переданные параметры остаются прежними.
+
+        fastpanel_path=None сбрасывает путь из настроек; найденный путь сбрасывается при смене настройки.
+        """
+        if ssh_manager is not None:
+            self.ssh = ssh_manager
+        if fastpanel_path is not _UNCHANGED and fastpanel_path != self.fastpanel_path_override:
+            self.fastpanel_path_override = fastpanel_path
+            self.fastpanel_path = None
+
     def _get_fastpanel_path(self) -> Optional[str]:
         """Определяет путь к исполняемому файлу fastpanel, отдавая приоритет настройкам."""
         if self.fastpanel_path:
@@ -123,11 +149,18 @@ class FastPanelService:
             if callback:
                 callback(message, progress)
 
-        report(f"Подключение к {host}...", 0.05)
-        if not self.ssh.connect(host, username, password):
-            result['error'] = f"Не удалось подключиться к {host}"
-            report(result['error'], 1.0)
-            return result
+        # Уже открытое (переданное извне) соединение к этому серверу не закрываем по завершении;
+        # соединение с другим сервером не трогаем и подключаемся отдельным менеджером
+        shared_ssh = self.ssh
+        owns_connection = not shared_ssh.is_connected_to(host, username)
+        if owns_connection:
+            if shared_ssh.is_active(): self.ssh = SSHManager()
+            report(f"Подключение к {host}...", 0.05)
+            if not self.ssh.connect(host, username, password):
+                self.ssh = shared_ssh
+                result['error'] = f"Не удалось подключиться к {host}"
+                report(result['error'], 1.0)
+                return result
 
         try:
             package_manager = self._check_os(report)
@@ -244,8 +277,10 @@ class FastPanelService:
             result['error'] = str(e)
             report(f"\n❌ Критическая ошибка: {e}", 1.0)
         finally:
-            self.ssh.disconnect()
-            report("SSH соединение закрыто.", 1.0)
+            if owns_connection:
+                self.ssh.disconnect()
+                self.ssh = shared_ssh
+                report("SSH соединение закрыто.", 1.0)
 
         return result
 
@@ -300,8 +335,9 @@ class FastPanelService:
         cmd = f"{fp_path} certificates create-le --server-name='{domain}' --email='{email}'"
         logger.info(f"Попытка выпуска SSL-сертификата для {domain} с email {email}...")
         
-        # Запускаем команду выпуска
-        result = self.ssh.execute(cmd, timeout=300) # Увеличим таймаут для SSL
+        # Запускаем команду выпуска; certbot держит глобальную блокировку - выпуски на сервере идут по одному
+        with _certbot_lock(self.ssh.current_host):
+            result = self.ssh.execute(cmd, timeout=300) # Увеличим таймаут для SSL
 
         # Даже если команда завершилась с кодом 0, нужна дополнительная проверка
         if not result.success:
@@ -2,6 +2,7 @@
 Namecheap Service - all operations with Namecheap
 """
 import requests
+from requests.adapters import HTTPAdapter
 from typing import List
 from src.utils.logger import get_logger
 
@@ -16,6 +17,9 @@ class NamecheapService:
         self.client_ip = client_ip
         # URL для рабочего (production) окружения
         self.base_url = "https://api.namecheap.com/xml.response"
+        # Одна сессия на сервис: соединение и TLS переиспользуются между запросами
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16))
 
 
     def update_nameservers(self, domain_name: str, nameservers: List[str]) -> bool:
@@ -41,7 +45,7 @@ class NamecheapService:
             "NameServers": ",".join(nameservers)
         }
         try:
-            response = requests.get(self.base_url, params=params, timeout=20)
+            response = self.session.get(self.base_url, params=params, timeout=20)
             response.raise_for_status()
             
             # ИЗМЕНЕНО: Более надежная проверка на ошибку.
@@ -8,27 +8,168 @@ import json
 from pathlib import Path
 from datetime import datetime, timedelta
 import threading
+import asyncio
+import queue
 from PIL import Image
 import os
 import sys
-import uuid
+from collections import deque
+from itertools import islice, groupby
+import secrets
 import webbrowser
 import ipaddress
 from src.services.fastpanel import FastPanelService
 from src.core.ssh_manager import SSHManager
-from functools import partial
+from functools import partial, lru_cache
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from src.services.cloudflare_service import CloudflareService
 from src.services.namecheap_service import NamecheapService
 from src.core.database_manager import DatabaseManager
 import time
 import csv
 import openpyxl
-from tkinter import filedialog
+from tkinter import filedialog, TclError, Menu, Canvas
+from urllib.parse import urlsplit
 
 # Настройка внешнего вида
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+# Шрифты создаются лениво (нужен корневой Tk) и переиспользуются всеми виджетами
+_FONTS = {}
+
+# Цвета уровней логов (теги текстового поля на вкладке "Логи")
+_LOG_COLORS = {"INFO": "#FFFFFF", "SUCCESS": "#00C853", "WARNING": "#FFAB00", "ERROR": "#D50000"}
+
+# Ключи настроек, которые относятся к учетным данным API (остальные - настройки приложения)
+_CRED_KEYS = frozenset({"cloudflare_token", "cloudflare_email", "namecheap_user", "namecheap_key", "namecheap_ip"})
+_CF_REQUIRED = frozenset({"cloudflare_token", "cloudflare_email"})
+_NC_REQUIRED = frozenset({"namecheap_user", "namecheap_key", "namecheap_ip"})
+
+# Интервал пакетного вывода логов (установки и вкладки "Логи"), мс
+_LOG_FLUSH_MS = 100
+
+# Цвета строки статуса в шапке
+_CONTENT_BG = ("#f5f5f5", "#1a1a1a")  # фон области вкладок (светлая, темная тема)
+_OK_COLOR = ("#4caf50", "#4caf50")
+_ERR_COLOR = ("#f44336", "#f44336")
+_STATUS_READY = "● Готов к работе"
+
+_DOMAIN_PAGE_SIZE = 50  # строк списка доменов, дорисовываемых за раз при прокрутке
+_MONITOR_INTERVAL = 3600  # секунд между опросами метрик серверов
+_TASK_CONCURRENCY = 8  # одновременных фоновых задач в одной пачке (привязка доменов и т.п.)
+_MONITOR_WORKERS = 16  # серверов, опрашиваемых мониторингом по SSH одновременно
+_SSH_SESSIONS = 4  # доменов, автоматизируемых одновременно по одному SSH соединению
+# Верхняя граница настройки ssh_concurrency: MaxSessions sshd по умолчанию 10, и то же соединение
+# еще нужно выпуску SSL и мониторингу
+_SSH_SESSIONS_MAX = 8
+# Результаты автоматизации пишутся в БД пачками: каждые N доменов или раз в N секунд,
+# чтобы пароли FTP и пути сайтов не терялись при падении посреди прогона
+_AUTOMATION_SAVE_BATCH = 5
+_AUTOMATION_SAVE_INTERVAL = 10.0
+_SSH_IDLE_TIMEOUT = 600  # секунд простоя, после которых соединение из пула SSH закрывается
+_SSH_REAP_INTERVAL = 60  # секунд между проверками пула на простаивающие соединения
+
+# Очередь вызовов из фоновых потоков разбирается в UI-потоке раз в _UI_DRAIN_MS
+_UI_DRAIN_MS = 50
+_UI_DRAIN_BATCH = 500
+
+# Минимальный интервал между полными перерисовками списков, мс (~30 кадров/с)
+_LIST_REFRESH_MS = 33
+
+# Сколько последних записей журнала держать в памяти (настройка log_buffer_size)
+_LOG_BUFFER_SIZE = 5000
+
+# Сколько последних строк лога установки держать в окне лога
+_LOG_WINDOW_LINES = 2000
+# Сколько строк лога установки хранить в памяти (для копирования и "полного лога")
+_INSTALL_LOG_LINES = 20000
+
+# Отображение статуса привязки домена к Cloudflare
+_STATUS_COLORS = {
+    "none": ("#666666", "#aaaaaa"),
+    "pending": ("#ff9800", "#f57c00"),
+    "active": ("#4caf50", "#2e7d32"),
+    "error": ("#f44336", "#d32f2f")
+}
+_STATUS_TEXT = {
+    "none": "⚪ Не привязан",
+    "pending": "🟡 В процессе...",
+    "active": "🟢 Активен",
+    "error": "🔴 Ошибка"
+}
+# Вид кнопки SSL в строке домена по статусу сертификата
+_SSL_BUTTON = {
+    "none": {"text": "Выпустить", "fg_color": ctk.ThemeManager.theme["CTkButton"]["fg_color"], "state": "normal"},
+    "pending": {"text": "⏳ Выпускается", "fg_color": ctk.ThemeManager.theme["CTkButton"]["fg_color"], "state": "disabled"},
+    "active": {"text": "✅ Активен", "fg_color": "green", "state": "normal"},
+    "error": {"text": "❌ Ошибка", "fg_color": "red", "state": "normal"},
+}
+
+# Метрики мониторинга одной командой SSH: строки CPU, RAM и диска (пустая строка - значение не получено).
+# Каждая метрика - один awk: CPU из /proc/stat (как и первый кадр top - с момента загрузки), без top/grep/sed
+_METRICS_COMMAND = (
+    "cpu=$(awk '/^cpu / {print 100 - $5 * 100 / ($2 + $3 + $4 + $5 + $6 + $7 + $8)}' /proc/stat); "
+    "ram=$(free | awk '/^Mem/ {print $3 / $2 * 100.0}'); "
+    "disk=$(df -P / | awk 'END {print $5 + 0}'); "
+    "printf '%s\\n%s\\n%s\\n' \"$cpu\" \"$ram\" \"$disk\""
+)
+
+@lru_cache(maxsize=1024)
+def _is_valid_ip(ip):
+    """Проверяет IP адрес; в файлах импорта одни и те же IP повторяются, поэтому результат кэшируется."""
+    try: ipaddress.ip_address(ip)
+    except ValueError: return False
+    return True
+
+@lru_cache(maxsize=1024)
+def _renewal_date(created_at, hosting_period_days):
+    """Дата продления сервера; кэшируется по (created_at, срок), поэтому разбирается один раз на сервер."""
+    return datetime.fromisoformat(created_at[:10]) + timedelta(days=int(hosting_period_days))
+
+def _host_from_url(url):
+    """Возвращает хост из URL панели или None, если URL некорректен."""
+    try: return urlsplit(url).hostname
+    except ValueError: return None
+
+def _text(value, default=""):
+    """Значение поля как строка для виджета; строки возвращаются без копирования, пустые - как default."""
+    if isinstance(value, str): return value or default
+    return str(value) if value else default
+
+def _setting_value(raw):
+    """Значение настройки из поля ввода в том же виде, в каком его вернет DatabaseManager.get_all_settings."""
+    try: return json.loads(raw)
+    except (json.JSONDecodeError, TypeError): return raw
+
+def _insert_log_lines(textbox, entries):
+    """Дописывает записи лога (level, line) в конец поля: подряд идущие строки одного уровня - одной вставкой."""
+    for tag, group in groupby(entries, key=lambda entry: entry[0] if entry[0] in _LOG_COLORS else "INFO"):
+        textbox.insert("end", "".join(log + "\n" for _, log in group), tag)
+
+def _trim_textbox(textbox, max_lines):
+    """Удаляет из начала текстового поля строки сверх max_lines."""
+    if int(textbox.index("end-1c").split(".")[0]) > max_lines + 1:
+        textbox.delete("1.0", f"end-{max_lines + 1}l")
+
+def _shutdown_executor(executor):
+    """Останавливает пул без ожидания, отменяя еще не начатые задачи."""
+    if sys.version_info >= (3, 9): executor.shutdown(wait=False, cancel_futures=True); return
+    # В Python 3.8 нет cancel_futures - выбираем ожидающие задачи из очереди пула сами
+    while True:
+        try: work_item = executor._work_queue.get_nowait()
+        except queue.Empty: break
+        if work_item is not None: work_item.future.cancel()
+    executor.shutdown(wait=False)
+
+def _font(size=None, weight=None, family=None):
+    """Возвращает общий CTkFont для сочетания параметров, создавая его один раз."""
+    key = (size, weight, family)
+    font = _FONTS.get(key)
+    if font is None: font = _FONTS[key] = ctk.CTkFont(family=family, size=size, weight=weight)
+    return font
+
 class InstructionWindow(ctk.CTkToplevel):
     """Окно для отображения инструкций."""
     def __init__(self, parent, title, instruction_text):
@@ -49,6 +190,8 @@ class InstructionWindow(ctk.CTkToplevel):
 
 class AutomationProgressWindow(ctk.CTkToplevel):
     """Окно для отображения прогресса и логов автоматизации."""
+    _RENDER_MS = 150
+
     def __init__(self, parent, server_name, total_domains):
         super().__init__(parent)
         self.title(f"Автоматизация: {server_name}")
@@ -68,17 +211,107 @@ class AutomationProgressWindow(ctk.CTkToplevel):
         self.log_textbox = ctk.CTkTextbox(self, wrap="word", state="disabled", font=("Courier", 12))
         self.log_textbox.pack(pady=10, padx=20, fill="both", expand=True)
 
+        # Строки лога и прогресс копятся и выводятся не чаще раза в _RENDER_MS;
+        # deque: строки добавляются прямо из рабочих потоков, без очереди UI
+        self._pending_lines = deque()
+        self._rendered_progress = 0
+        self.after(self._RENDER_MS, self._render)
+
     def add_log(self, message):
-        self.log_textbox.configure(state="normal")
-        self.log_textbox.insert("end", message + "\n")
-        self.log_textbox.see("end")
-        self.log_textbox.configure(state="disabled")
+        """Можно вызывать из любого потока."""
+        self._pending_lines.append(message)
 
     def increment_progress(self):
         self.progress += 1
-        progress_value = self.progress / self.total if self.total > 0 else 0
-        self.progress_bar.set(progress_value)
-        self.progress_label.configure(text=f"Обработано {self.progress} из {self.total} доменов")
+
+    def _render(self):
+        if not self.winfo_exists(): return
+        if self._pending_lines:
+            lines = [self._pending_lines.popleft() for _ in range(len(self._pending_lines))]
+            self.log_textbox.configure(state="normal")
+            self.log_textbox.insert("end", "\n".join(lines) + "\n")
+            _trim_textbox(self.log_textbox, _LOG_BUFFER_SIZE)
+            self.log_textbox.see("end")
+            self.log_textbox.configure(state="disabled")
+        if self.progress != self._rendered_progress:
+            self._rendered_progress = self.progress
+            progress_value = self.progress / self.total if self.total > 0 else 0
+            self.progress_bar.set(progress_value)
+            self.progress_label.configure(text=f"Обработано {self.progress} из {self.total} доменов")
+        self.after(self._RENDER_MS, self._render)
+
+
+class _DomainRowCallbacks:
+    """Обработчики команд одной строки таблицы доменов (вместо набора lambda на строку).
+
+    Ссылку на domain_info не держит: запись ищется по имени в момент нажатия.
+    """
+    __slots__ = ("app", "domain", "var", "server_button")
+
+    def __init__(self, app, domain, var):
+        self.app = app
+        self.domain = domain
+        self.var = var
+        self.server_button = None
+
+    def _with_info(self, handler):
+        domain_info = self.app._domains_by_name.get(self.domain)
+        if domain_info is not None: handler(domain_info)
+
+    def on_select(self):
+        self.app.toggle_domain_selection(self.domain, self.var)
+
+    def on_server_menu(self):
+        self.app.show_domain_server_menu(self.domain, self.server_button)
+
+    def on_ftp(self):
+        self._with_info(self.app.show_ftp_credentials_dialog)
+
+    def on_ssl(self):
+        self._with_info(self.app.start_ssl_issuance)
+
+    def on_edit(self):
+        self._with_info(self.app.show_edit_domain_dialog)
+
+    def on_delete(self):
+        self._with_info(self.app.delete_domain)
+
+
+class ScrollableList(ctk.CTkFrame):
+    """
+    Прокручиваемый список на собственном tk.Canvas: строки кладутся в body,
+    on_near_end вызывается, когда видимая область подходит к нижнему краю
+    """
+    _NEAR_END = 0.9
+
+    def __init__(self, parent, bg, on_near_end=None, **kwargs):
+        super().__init__(parent, fg_color=bg, corner_radius=0, **kwargs)
+        self._on_near_end = on_near_end
+        self._canvas = Canvas(self, highlightthickness=0, bd=0, bg=bg[ctk.get_appearance_mode() == "Dark"])
+        self._scrollbar = ctk.CTkScrollbar(self, command=self._canvas.yview)
+        self._scrollbar.pack(side="right", fill="y")
+        self._canvas.pack(side="left", fill="both", expand=True)
+        self.body = ctk.CTkFrame(self._canvas, fg_color=bg, corner_radius=0)
+        self._window = self._canvas.create_window(0, 0, window=self.body, anchor="nw")
+        self._canvas.configure(yscrollcommand=self._on_scroll)
+        self.body.bind("<Configure>", lambda e: self._canvas.configure(scrollregion=self._canvas.bbox("all")))
+        self._canvas.bind("<Configure>", lambda e: self._canvas.itemconfigure(self._window, width=e.width))
+        # Колесо мыши приходит виджету под курсором (строке списка) - ловим глобально и проверяем, что курсор над списком
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.bind_all(sequence, self._on_wheel, add="+")
+
+    def _on_scroll(self, first, last):
+        self._scrollbar.set(first, last)
+        if self._on_near_end and float(last) > self._NEAR_END: self._on_near_end()
+
+    def _on_wheel(self, event):
+        if not self.winfo_ismapped(): return
+        widget = self.winfo_containing(event.x_root, event.y_root)
+        if widget is None or not str(widget).startswith(str(self._canvas)): return
+        if event.num == 4: step = -1
+        elif event.num == 5: step = 1
+        else: step = -event.delta // 120 if sys.platform == "win32" else -event.delta
+        if step: self._canvas.yview_scroll(step, "units")
 
 
 class ServerCard(ctk.CTkFrame):
@@ -99,85 +332,93 @@ class ServerCard(ctk.CTkFrame):
         )
 
         self._create_widgets()
-        self.check_installation_status()
+        self.update_data(server_data)
 
     def _create_widgets(self):
-        main_frame = ctk.CTkFrame(self, fg_color="transparent")
-        main_frame.pack(fill="both", expand=True, padx=15, pady=12)
-
-        top_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
-        top_frame.pack(fill="x", pady=(0, 8))
+        # Без промежуточной рамки: строки карточки лежат прямо в ней, чтобы на сервер приходилось меньше виджетов
+        top_frame = ctk.CTkFrame(self, fg_color="transparent")
+        top_frame.pack(fill="x", padx=15, pady=(12, 8))
 
-        server_icon = ctk.CTkLabel(top_frame, text="🖥️", font=ctk.CTkFont(size=24))
+        server_icon = ctk.CTkLabel(top_frame, text="🖥️", font=_font(size=24))
         server_icon.pack(side="left", padx=(0, 10))
 
         info_frame = ctk.CTkFrame(top_frame, fg_color="transparent")
         info_frame.pack(side="left", fill="x", expand=True)
 
-        name_label = ctk.CTkLabel(info_frame, text=self.server_data.get("name", "Безымянный сервер"), font=ctk.CTkFont(size=16, weight="bold"), anchor="w")
-        name_label.pack(fill="x")
-
-        ip_label = ctk.CTkLabel(info_frame, text=f"IP: {self.server_data.get('ip', 'Не указан')}", font=ctk.CTkFont(size=12), text_color=("#666666", "#aaaaaa"), anchor="w")
-        ip_label.pack(fill="x")
+        self.name_label = ctk.CTkLabel(info_frame, text="", font=_font(size=16, weight="bold"), anchor="w")
+        self.name_label.pack(fill="x")
 
-        if self.server_data.get("fastpanel_installed"):
-            status_badge = ctk.CTkLabel(info_frame, text="✅ FastPanel установлен", font=ctk.CTkFont(size=11), text_color=("#4caf50", "#2e7d32"), anchor="w")
-            status_badge.pack(fill="x", pady=(2,0))
-        else:
-            status_badge = ctk.CTkLabel(info_frame, text="⏳ Не установлен", font=ctk.CTkFont(size=11), text_color=("#ff9800", "#f57c00"), anchor="w")
-            status_badge.pack(fill="x", pady=(2,0))
-
-        automation_btn = ctk.CTkButton(top_frame, text="▶️ Запустить автоматизацию", command=lambda: self._on_start_automation())
-        automation_btn.pack(side="right", padx=(10,0))
-
-        app = self.winfo_toplevel()
-        server_has_domains = any(d.get("server_id") == self.server_data.get("id") for d in app.domains)
-        if not server_has_domains or not self.server_data.get("fastpanel_installed"):
-            automation_btn.configure(state="disabled")
+        self.ip_label = ctk.CTkLabel(info_frame, text="", font=_font(size=12), text_color=("#666666", "#aaaaaa"), anchor="w")
+        self.ip_label.pack(fill="x")
 
+        self.status_badge = ctk.CTkLabel(info_frame, text="", font=_font(size=11), anchor="w")
+        self.status_badge.pack(fill="x", pady=(2,0))
 
-        separator = ctk.CTkFrame(main_frame, height=1, fg_color=("#e0e0e0", "#404040"))
-        separator.pack(fill="x", pady=8)
+        self.automation_btn = ctk.CTkButton(top_frame, text="▶️ Запустить автоматизацию", command=lambda: self._on_start_automation())
+        self.automation_btn.pack(side="right", padx=(10,0))
 
-        bottom_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
-        bottom_frame.pack(fill="x")
+        separator = ctk.CTkFrame(self, height=1, fg_color=("#e0e0e0", "#404040"))
+        separator.pack(fill="x", padx=15, pady=8)
 
-        # --- WIDGETS FOR INSTALLATION ---
-        self.install_progress = ctk.CTkProgressBar(bottom_frame)
-        self.install_progress.set(0)
+        self.bottom_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.bottom_frame.pack(fill="x", padx=15, pady=(0, 12))
 
-        self.log_button = ctk.CTkButton(bottom_frame, text="Посмотреть лог", width=120, height=28, font=ctk.CTkFont(size=12), command=self._on_show_log)
+        # Кнопки и прогресс установки создаются при первом показе (_action_widget)
+        self._actions = {}
+        self.install_progress = None
 
-        # --- REGULAR WIDGETS ---
-        if self.server_data.get("fastpanel_installed"):
-            self.manage_btn = ctk.CTkButton(bottom_frame, text="Управление", width=100, height=28, font=ctk.CTkFont(size=12), command=lambda: self._on_manage())
-            self.manage_btn.pack(side="left", padx=(0, 5))
-            self.panel_btn = ctk.CTkButton(bottom_frame, text="Открыть панель", width=100, height=28, font=ctk.CTkFont(size=12), fg_color=("#4caf50", "#2e7d32"), hover_color=("#45a049", "#1b5e20"), command=lambda: self._open_panel())
-            self.panel_btn.pack(side="left", padx=5)
-        else:
-            self.install_btn = ctk.CTkButton(bottom_frame, text="Установить FastPanel", width=150, height=28, font=ctk.CTkFont(size=12), fg_color=("#2196f3", "#1976d2"), hover_color=("#1976d2", "#1565c0"), command=lambda: self._on_install())
-            self.install_btn.pack(side="left")
-
-        self.delete_btn = ctk.CTkButton(bottom_frame, text="🗑️", width=30, height=28, fg_color=("#f44336", "#d32f2f"), hover_color=("#da190b", "#b71c1c"), command=lambda: self._on_delete())
+        self.delete_btn = ctk.CTkButton(self.bottom_frame, text="🗑️", width=30, height=28, fg_color=("#f44336", "#d32f2f"), hover_color=("#da190b", "#b71c1c"), command=lambda: self._on_delete())
         self.delete_btn.pack(side="right")
 
-        self.edit_btn = ctk.CTkButton(bottom_frame, text="✏️", width=30, height=28, command=lambda: self._on_edit())
+        self.edit_btn = ctk.CTkButton(self.bottom_frame, text="✏️", width=30, height=28, command=lambda: self._on_edit())
         self.edit_btn.pack(side="right", padx=5)
 
-    def set_install_mode(self, installing=True):
-        if installing:
-            self.install_btn.pack_forget()
-            if hasattr(self, 'manage_btn'): self.manage_btn.pack_forget()
-            if hasattr(self, 'panel_btn'): self.panel_btn.pack_forget()
-
-            self.install_progress.pack(side="left", fill="x", expand=True, padx=(0,10))
-            self.log_button.pack(side="left")
-        # No 'else' needed as the whole UI will be redrawn
+    def _action_widget(self, name):
+        widget = self._actions.get(name)
+        if widget is not None: return widget
+        parent = self.bottom_frame
+        if name == "install_progress":
+            widget = self.install_progress = ctk.CTkProgressBar(parent)
+            widget.set(0)
+        elif name == "log_button":
+            widget = ctk.CTkButton(parent, text="Посмотреть лог", width=120, height=28, font=_font(size=12), command=self._on_show_log)
+        elif name == "manage":
+            widget = ctk.CTkButton(parent, text="Управление", width=100, height=28, font=_font(size=12), command=lambda: self._on_manage())
+        elif name == "panel":
+            widget = ctk.CTkButton(parent, text="Открыть панель", width=100, height=28, font=_font(size=12), fg_color=("#4caf50", "#2e7d32"), hover_color=("#45a049", "#1b5e20"), command=lambda: self._open_panel())
+        else:
+            widget = ctk.CTkButton(parent, text="Установить FastPanel", width=150, height=28, font=_font(size=12), fg_color=("#2196f3", "#1976d2"), hover_color=("#1976d2", "#1565c0"), command=lambda: self._on_install())
+        self._actions[name] = widget
+        return widget
 
-    def check_installation_status(self):
-        server_id = self.server_data.get("id")
-        if server_id in self.app.installation_states and self.app.installation_states[server_id].get("installing"):
-            self.set_install_mode(True)
+    def update_data(self, server_data):
+        """Обновляет карточку под новые данные сервера без пересоздания виджетов."""
+        self.server_data = server_data
+        installed = bool(server_data.get("fastpanel_installed"))
+        self.name_label.configure(text=server_data.get("name", "Безымянный сервер"))
+        self.ip_label.configure(text=f"IP: {server_data.get('ip', 'Не указан')}")
+        if installed:
+            self.status_badge.configure(text="✅ FastPanel установлен", text_color=("#4caf50", "#2e7d32"))
+        else:
+            self.status_badge.configure(text="⏳ Не установлен", text_color=("#ff9800", "#f57c00"))
+
+        server_has_domains = bool(self.app._domains_by_server_id.get(server_data.get("id")))
+        self.automation_btn.configure(state="normal" if server_has_domains and installed else "disabled")
+        self._layout_actions()
+
+    def _layout_actions(self):
+        for widget in self._actions.values(): widget.pack_forget()
+        state = self.app.installation_states.get(self.server_data.get("id"))
+        if state and state.get("installing"):
+            progress = self._action_widget("install_progress")
+            progress.set(state.get("progress", 0))
+            progress.pack(side="left", fill="x", expand=True, padx=(0,10))
+            self._action_widget("log_button").pack(side="left")
+        elif self.server_data.get("fastpanel_installed"):
+            self._action_widget("manage").pack(side="left", padx=(0, 5))
+            self._action_widget("panel").pack(side="left", padx=5)
+        else:
+            self._action_widget("install").pack(side="left")
 
     def _on_manage(self):
         if self.on_click: self.on_click("manage", self.server_data)
@@ -209,28 +450,103 @@ class FastPanelApp(ctk.CTk):
         self.center_window()
 
         self.db = DatabaseManager()
+        # Записи в БД выполняются последовательно в фоновом потоке
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+        # Отложенные записи настроек: ключ -> последнее значение, сбрасываются одной транзакцией
+        self._pending_settings = {}
+        self._pending_settings_lock = threading.Lock()
+        # Фоновые вычисления и сетевые операции, результат возвращается через _post_ui
+        self._io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="io")
+        # Отдельный пул для опроса серверов: мониторинг не ждет установок и выпуска SSL и не задерживает их
+        self._monitor_executor = ThreadPoolExecutor(max_workers=_MONITOR_WORKERS, thread_name_prefix="monitor")
+        # Фоновые потоки передают обновления UI через очередь, а не через after(0, ...)
+        self._ui_queue = queue.Queue()
 
         self.servers = []
         self.domains = []
-        self.logs = []
+        self._servers_by_id = {}
+        self._servers_by_ip = {}
+        # Серверы в порядке показа с ключами поиска; None - пересобрать при следующем показе
+        self._sorted_servers = None
+        self._server_ip_list = None  # кэш _server_ip_choices
+        self._domains_by_name = {}
+        self._domains_by_server_id = {}
+        self.logs = deque(maxlen=_LOG_BUFFER_SIZE)
+        self._logs_total = 0
+        # log_action зовется из рабочих потоков: запись, счетчик и замена буфера - под одной блокировкой
+        self._logs_lock = threading.Lock()
+        # Отформатированная метка времени кэшируется на секунду: (секунда, строка)
+        self._ts_cache = (0, "")
+        # Вкладка логов дополняется новыми строками, а не перестраивается
+        self._logs_textbox = None
+        self._logs_filter = "Все"
+        self._logs_rendered = 0  # значение _logs_total на момент последней отрисовки
+        self._logs_flush_pending = False
         self.current_tab = "servers"
+        # Вкладки, данные которых изменились, пока они были скрыты
+        self._dirty_tabs = set()
+        # Вкладки, ожидающие отложенной перерисовки (не чаще раза в _LIST_REFRESH_MS)
+        self._pending_list_refresh = set()
         self.installation_states = {}
+        # Пул SSH соединений по (ip, ssh_user), переиспользуется между операциями
+        self._ssh_pool = {}
+        self._ssh_pool_lock = threading.Lock()
+        # Сколько операций сейчас держат соединение и с какого момента оно простаивает
+        self._ssh_users = {}
+        self._ssh_idle_since = {}
+        # Сервисы FastPanel по тому же ключу: хранят найденный путь к утилите между запусками
+        self._fp_services = {}
+        # (учетные данные, CloudflareService, NamecheapService): клиенты API переиспользуются между доменами
+        self._api_clients_cache = None
+        # Буфер строк лога установки: сбрасывается в UI пачкой раз в _LOG_FLUSH_MS
+        self._log_buffers = {}
+        self._log_flush_scheduled = set()
+        self._log_lock = threading.Lock()
         self.domain_widgets = {}
+        # Пул карточек серверов текущего списка: переиспользуются при поиске и обновлениях
+        self._card_pool = {}
+        self._servers_empty_frame = None
+        self._search_after_id = None
+        self._search_text = ""  # текст поиска на момент последнего планирования
+        self._server_menu = None  # общее меню выбора сервера для строк доменов
+        # Список доменов рисуется страницами: отрисованы self.domains[:_domain_rows_rendered]
+        self._domain_rows_rendered = 0
+        self._domain_page_pending = False
+        self._server_list_rendered = None  # ключ _server_list_key последней отрисовки списка
         self.selected_domains = set()
         self.server_metrics = {}
         self.server_statuses = {}
+        # Карточки мониторинга по id сервера: переиспользуются, при изменении списка серверов создаются/удаляются только разница
+        self.monitoring_cards = {}
+        self._monitoring_order = []
+        # Серверы опрашиваются только пока открыта вкладка мониторинга (after-задача _monitoring_job)
+        self._monitoring_job = None
+        self._monitoring_polled_at = float("-inf")
+        self._monitoring_empty_label = None
 
         self.app_settings = {}
         self.credentials = {}
+        # Рамки вкладок создаются при первом показе и затем только скрываются
+        self._tab_frames = {}
+        # Часто открываемые диалоги тоже создаются один раз и затем только прячутся (_cached_dialog)
+        self._dialogs = {}
+        # Поля ввода настроек по ключу; подвкладки настроек строятся при первом выборе
+        self._settings_entries = {}
+        self._settings_tabview = None
+        self._settings_builders = {}
         
         # Для массового добавления
         self.bulk_add_widgets = {}
+        self._status_reset_job = None
 
-        self.load_data_from_db()
+        # При запуске очередь записей пуста, а виджетам данные нужны сразу - читаем синхронно
+        self._apply_db_data(*self._read_db_data())
 
         self.log_action("Приложение запущено")
         self._create_widgets()
         self.after(100, self._update_server_list)
+        self.after(_UI_DRAIN_MS, self._drain_ui_queue)
+        self.after(_SSH_REAP_INTERVAL * 1000, self._schedule_ssh_reap)
 
         if sys.platform == "darwin" and os.path.exists("assets/icon.icns"):
             self.iconbitmap("assets/icon.icns")
@@ -243,22 +559,33 @@ class FastPanelApp(ctk.CTk):
         self.bind_class("CTkTextbox", "<<Paste>>", self.handle_paste)
 
         self.check_server_renewals()
-        self.start_monitoring()
+        self._start_aio_loop()
 
     ## ИЗМЕНЕНО: Обработчик вставки
     def handle_paste(self, event):
         """Обработка вставки из буфера обмена для всех виджетов."""
+        # event.widget - это виджет, который получил событие
+        widget = event.widget
+        # В неактивные поля не вставляем и буфер обмена не запрашиваем
+        if not isinstance(widget, (ctk.CTkEntry, ctk.CTkTextbox)) or str(widget.cget("state")) == "disabled":
+            return "break"
+        try: text = self.clipboard_get()
+        except TclError: return "break"  # буфер пуст или содержит не текст
         try:
-            # event.widget - это виджет, который получил событие
-            widget = event.widget
-            if isinstance(widget, (ctk.CTkEntry, ctk.CTkTextbox)):
-                widget.insert("insert", self.clipboard_get())
+            widget.insert("insert", text)
         except Exception as e:
             self.log_action(f"Ошибка вставки: {e}", "WARNING")
         # Возвращаем "break", чтобы предотвратить дальнейшую обработку события
         return "break"
 
     def on_closing(self):
+        self._aio_loop.call_soon_threadsafe(self._aio_loop.stop)
+        with self._ssh_pool_lock:
+            pooled, self._ssh_pool = list(self._ssh_pool.values()), {}
+        for ssh in pooled: ssh.disconnect()
+        _shutdown_executor(self._io_executor)
+        _shutdown_executor(self._monitor_executor)
+        self._db_executor.shutdown(wait=True)
         self.db.close()
         self.destroy()
 
@@ -273,7 +600,7 @@ class FastPanelApp(ctk.CTk):
         main_container = ctk.CTkFrame(self, fg_color="transparent")
         main_container.pack(fill="both", expand=True)
         self._create_sidebar(main_container)
-        self.content_frame = ctk.CTkFrame(main_container, fg_color=("#f5f5f5", "#1a1a1a"), corner_radius=0)
+        self.content_frame = ctk.CTkFrame(main_container, fg_color=_CONTENT_BG, corner_radius=0)
         self.content_frame.pack(side="right", fill="both", expand=True)
         self._create_header()
         self.tab_container = ctk.CTkFrame(self.content_frame, fg_color="transparent")
@@ -288,8 +615,8 @@ class FastPanelApp(ctk.CTk):
         logo_frame = ctk.CTkFrame(self.sidebar, fg_color="transparent")
         logo_frame.pack(fill="x", padx=20, pady=20)
 
-        ctk.CTkLabel(logo_frame, text="🚀 FastPanel", font=ctk.CTkFont(size=24, weight="bold")).pack()
-        ctk.CTkLabel(logo_frame, text="Automation Tool", font=ctk.CTkFont(size=12), text_color=("#666666", "#aaaaaa")).pack()
+        ctk.CTkLabel(logo_frame, text="🚀 FastPanel", font=_font(size=24, weight="bold")).pack()
+        ctk.CTkLabel(logo_frame, text="Automation Tool", font=_font(size=12), text_color=("#666666", "#aaaaaa")).pack()
 
         ctk.CTkFrame(self.sidebar, height=2, fg_color=("#e0e0e0", "#404040")).pack(fill="x", padx=20, pady=10)
 
@@ -306,70 +633,142 @@ class FastPanelApp(ctk.CTk):
 
         self.nav_buttons = {}
         for icon, text, command in nav_buttons:
-            btn = ctk.CTkButton(self.sidebar, text=f"{icon}  {text}", font=ctk.CTkFont(size=14), height=40, fg_color="transparent", text_color=("#000000", "#ffffff"), hover_color=("#e0e0e0", "#404040"), anchor="w", command=command)
+            btn = ctk.CTkButton(self.sidebar, text=f"{icon}  {text}", font=_font(size=14), height=40, fg_color="transparent", text_color=("#000000", "#ffffff"), hover_color=("#e0e0e0", "#404040"), anchor="w", command=command)
             btn.pack(fill="x", padx=15, pady=2)
             self.nav_buttons[text] = btn
 
 
         info_frame = ctk.CTkFrame(self.sidebar, fg_color="transparent")
         info_frame.pack(side="bottom", fill="x", padx=20, pady=20)
-        ctk.CTkLabel(info_frame, text="Version 1.3.0", font=ctk.CTkFont(size=10), text_color=("#999999", "#666666")).pack()
-        self.status_label = ctk.CTkLabel(info_frame, text="● Готов к работе", font=ctk.CTkFont(size=11), text_color=("#4caf50", "#4caf50"))
+        ctk.CTkLabel(info_frame, text="Version 1.3.0", font=_font(size=10), text_color=("#999999", "#666666")).pack()
+        self.status_label = ctk.CTkLabel(info_frame, text=_STATUS_READY, font=_font(size=11), text_color=_OK_COLOR)
         self.status_label.pack(pady=(5, 0))
 
     def _create_header(self):
         header_frame = ctk.CTkFrame(self.content_frame, height=80, fg_color="transparent")
         header_frame.pack(fill="x", padx=20, pady=(20, 10))
         header_frame.pack_propagate(False)
-        self.page_title = ctk.CTkLabel(header_frame, text="Управление серверами", font=ctk.CTkFont(size=28, weight="bold"))
+        self.page_title = ctk.CTkLabel(header_frame, text="Управление серверами", font=_font(size=28, weight="bold"))
         self.page_title.pack(side="left")
-        ctk.CTkButton(header_frame, text="🔄 Обновить", width=100, height=32, font=ctk.CTkFont(size=12), fg_color=("#2196f3", "#1976d2"), hover_color=("#1976d2", "#1565c0"), command=self.refresh_data).pack(side="right", padx=(10, 0))
-        self.search_entry = ctk.CTkEntry(header_frame, placeholder_text="🔍 Поиск серверов...", width=250, height=32, font=ctk.CTkFont(size=12))
+        ctk.CTkButton(header_frame, text="🔄 Обновить", width=100, height=32, font=_font(size=12), fg_color=("#2196f3", "#1976d2"), hover_color=("#1976d2", "#1565c0"), command=self.refresh_data).pack(side="right", padx=(10, 0))
+        self.search_entry = ctk.CTkEntry(header_frame, placeholder_text="🔍 Поиск серверов...", width=250, height=32, font=_font(size=12))
         self.search_entry.pack(side="right", padx=10)
-        self.search_entry.bind("<KeyRelease>", self._update_server_list)
+        self.search_entry.bind("<KeyRelease>", self._schedule_update_server_list)
 
     def show_servers_tab(self):
         self.clear_tab_container()
         self.page_title.configure(text="Управление серверами")
         self.current_tab = "servers"
-        top_panel = ctk.CTkFrame(self.tab_container, fg_color="transparent")
-        top_panel.pack(fill="x", pady=(0, 10))
-        ctk.CTkButton(top_panel, text="➕ Добавить сервер", font=ctk.CTkFont(size=14, weight="bold"), width=200, height=40, command=self.show_add_server_tab, fg_color="#2196f3", hover_color="#1976d2").pack(side="left")
-        self.scrollable_servers = ctk.CTkScrollableFrame(self.tab_container, fg_color="transparent")
-        self.scrollable_servers.pack(fill="both", expand=True)
-        self._update_server_list()
+        frame, created = self._tab_frame("servers")
+        if created:
+            top_panel = ctk.CTkFrame(frame, fg_color="transparent")
+            top_panel.pack(fill="x", pady=(0, 10))
+            ctk.CTkButton(top_panel, text="➕ Добавить сервер", font=_font(size=14, weight="bold"), width=200, height=40, command=self.show_add_server_tab, fg_color="#2196f3", hover_color="#1976d2").pack(side="left")
+            self.scrollable_servers = ctk.CTkScrollableFrame(frame, fg_color="transparent")
+            self.scrollable_servers.pack(fill="both", expand=True)
+        if created or "servers" in self._dirty_tabs: self._update_server_list()
+
+    def _schedule_update_server_list(self, event=None):
+        """Откладывает фильтрацию списка до паузы в наборе текста поиска."""
+        # Стрелки, Shift и прочие клавиши без изменения текста не трогают список
+        text = self.search_entry.get()
+        if text == self._search_text: return
+        self._search_text = text
+        if self._search_after_id: self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(120, self._update_server_list)
 
     def _update_server_list(self, event=None):
-        if not hasattr(self, 'scrollable_servers'): return
-        for widget in self.scrollable_servers.winfo_children():
-            widget.destroy()
+        self._search_after_id = None
+        if self.current_tab != "servers" or not hasattr(self, 'scrollable_servers'):
+            self._dirty_tabs.add("servers"); return
+        self._dirty_tabs.discard("servers")
 
         search_query = self.search_entry.get().lower()
-        sorted_servers = sorted(self.servers, key=lambda s: s.get('created_at', ''), reverse=True)
-        filtered_servers = [s for s in sorted_servers if search_query in s.get("name", "").lower() or search_query in s.get("ip", "").lower()]
+        # Ничего из показанного на карточках не изменилось - список уже актуален
+        render_key = self._server_list_key(search_query)
+        if render_key == self._server_list_rendered: return
+        self._server_list_rendered = render_key
+        filtered_servers = [s for s, name_lc, ip_lc in self._server_search_list() if search_query in name_lc or search_query in ip_lc]
+
+        # Карточки удаленных серверов уничтожаем, отфильтрованных - только скрываем
+        visible_ids = {s["id"] for s in filtered_servers}
+        for server_id, card in list(self._card_pool.items()):
+            if server_id not in self._servers_by_id:
+                card.destroy(); del self._card_pool[server_id]
+            elif server_id not in visible_ids:
+                card.pack_forget()
 
         if not filtered_servers:
-            empty_frame = ctk.CTkFrame(self.scrollable_servers, fg_color="transparent")
-            empty_frame.pack(expand=True, pady=50)
-            ctk.CTkLabel(empty_frame, text="📭", font=ctk.CTkFont(size=64)).pack()
-            ctk.CTkLabel(empty_frame, text="Нет добавленных серверов", font=ctk.CTkFont(size=18, weight="bold")).pack(pady=(20, 10))
-            ctk.CTkLabel(empty_frame, text="Добавьте первый сервер, чтобы начать работу", font=ctk.CTkFont(size=14), text_color=("#666666", "#aaaaaa")).pack()
+            self._show_servers_empty_frame(True)
+            return
+        self._show_servers_empty_frame(False)
+
+        cards = []
+        for server in filtered_servers:
+            card = self._card_pool.get(server["id"])
+            if card is None:
+                card = self._card_pool[server["id"]] = ServerCard(self.scrollable_servers, server, on_click=self.handle_server_action)
+            else:
+                card.update_data(server)
+            cards.append(card)
+        # Перепаковываем только если изменился состав или порядок
+        if self.scrollable_servers.pack_slaves() != cards:
+            for card in cards: card.pack_forget()
+            for card in cards: card.pack(fill="x", pady=5)
+
+    def _server_list_key(self, search_query):
+        """Все, от чего зависят карточки списка серверов: запрос и отображаемые поля каждого сервера."""
+        states = self.installation_states
+        return (search_query, tuple(
+            (s["id"], name_lc, ip_lc, bool(s.get("fastpanel_installed")), bool(self._domains_by_server_id.get(s["id"])), bool(states.get(s["id"], {}).get("installing")))
+            for s, name_lc, ip_lc in self._server_search_list()
+        ))
+
+    def _server_search_list(self):
+        """Серверы в порядке показа (новые первыми) с именем и IP в нижнем регистре."""
+        if self._sorted_servers is None:
+            # self.servers уже упорядочен: БД отдает ORDER BY created_at DESC, новые вставляются в начало
+            self._sorted_servers = [(s, (s.get("name") or "").lower(), (s.get("ip") or "").lower()) for s in self.servers]
+        return self._sorted_servers
+
+    def _invalidate_server_views(self):
+        """Сбрасывает кэш порядка серверов и помечает зависящие от списка серверов вкладки."""
+        self._sorted_servers = None
+        # Словари серверов могли быть пересозданы - карточки должны получить новые через update_data
+        self._server_list_rendered = None
+        self._server_ip_list = None
+        self._dirty_tabs.update(("servers", "domain", "monitoring"))
+
+    def _show_servers_empty_frame(self, show):
+        if not show:
+            if self._servers_empty_frame: self._servers_empty_frame.pack_forget()
+            return
+        if self._servers_empty_frame is None:
+            empty_frame = self._servers_empty_frame = ctk.CTkFrame(self.scrollable_servers, fg_color="transparent")
+            ctk.CTkLabel(empty_frame, text="📭", font=_font(size=64)).pack()
+            ctk.CTkLabel(empty_frame, text="Нет добавленных серверов", font=_font(size=18, weight="bold")).pack(pady=(20, 10))
+            ctk.CTkLabel(empty_frame, text="Добавьте первый сервер, чтобы начать работу", font=_font(size=14), text_color=("#666666", "#aaaaaa")).pack()
+        self._servers_empty_frame.pack(expand=True, pady=50)
+
+    def _render_server_card(self, server_id):
+        """Обновляет карточку одного сервера вместо всего списка."""
+        if self.current_tab != "servers": self._dirty_tabs.add("servers"); return
+        card = self._card_pool.get(server_id)
+        server = self._servers_by_id.get(server_id)
+        if card is not None and server is not None:
+            card.update_data(server)
+        elif card is not None and self.servers:
+            card.destroy(); del self._card_pool[server_id]
         else:
-            for server in filtered_servers:
-                card = ServerCard(self.scrollable_servers, server, on_click=self.handle_server_action)
-                card.pack(fill="x", pady=5)
-                server_id = server.get("id")
-                if server_id and server_id in self.installation_states:
-                    self.installation_states[server_id]['card'] = card
+            # Карточки еще нет или список опустел - перестраиваем список
+            self._mark_dirty("servers")
 
     def add_or_update_server(self, server_type, server_data=None):
         is_editing = server_data is not None
 
         if server_type == 'new':
             ip = self.server_ip_entry.get()
-            try:
-                ipaddress.ip_address(ip)
-            except ValueError:
+            if not _is_valid_ip(ip):
                 self.show_error("Неверный формат IP адреса")
                 return
 
@@ -394,67 +793,191 @@ class FastPanelApp(ctk.CTk):
             if not payload["admin_url"] or not payload["admin_password"]:
                 self.show_error("URL и пароль обязательны")
                 return
-            try:
-                payload["ip"] = payload["admin_url"].split("://")[1].split(":")[0]
-            except:
+            payload["ip"] = _host_from_url(payload["admin_url"])
+            if not payload["ip"]:
                 self.show_error("Неверный формат URL")
                 return
             if not payload["name"]: payload["name"] = payload["ip"]
 
         if is_editing:
-            self.db.update_server(server_data['id'], payload)
+            server = self._servers_by_id.get(server_data['id'])
+            if server is None: return
+            snapshot = dict(server)
+            server.update(payload)
+            self._index_servers()
+            def rollback():
+                server.clear(); server.update(snapshot)
+                self._index_servers()
+                self.show_error(f"Не удалось сохранить сервер {snapshot['name']}")
+                self._mark_dirty("servers")
+            self._submit_db(self.db.update_server, server['id'], dict(payload), on_error=rollback)
             self.log_action(f"Сервер '{payload['name']}' обновлен")
             self.show_success(f"Сервер {payload['name']} обновлен")
         else:
+            if payload['ip'] in self._servers_by_ip:
+                self.show_error(f"Сервер с IP {payload['ip']} уже существует!")
+                return
             payload.update({
-                "id": str(uuid.uuid4())[:8],
+                "id": secrets.token_hex(4),
                 "fastpanel_installed": server_type == "existing",
             })
-            if self.db.add_server(payload):
-                self.log_action(f"Добавлен новый сервер: '{payload['name']}'")
-                self.show_success(f"Сервер {payload['name']} добавлен")
-            else:
+            self._remember_server(payload)
+            def rollback():
+                self._forget_server(payload['id'])
                 self.show_error(f"Сервер с IP {payload['ip']} уже существует!")
-                return
+                self._mark_dirty("servers")
+            self._submit_db(self.db.add_server, dict(payload), on_error=rollback)
+            self.log_action(f"Добавлен новый сервер: '{payload['name']}'")
+            self.show_success(f"Сервер {payload['name']} добавлен")
 
-        self.refresh_data()
         self.show_servers_tab()
 
+    def _post_ui(self, fn, *args):
+        """Ставит вызов в очередь UI-потока; безопасно вызывать из любого потока."""
+        self._ui_queue.put((fn, args))
+
+    def _drain_ui_queue(self):
+        """Выполняет накопившиеся вызовы из фоновых потоков одной пачкой."""
+        try:
+            for _ in range(_UI_DRAIN_BATCH):
+                try: fn, args = self._ui_queue.get_nowait()
+                except queue.Empty: break
+                try: fn(*args)
+                except Exception: self.report_callback_exception(*sys.exc_info())
+        finally:
+            self.after(_UI_DRAIN_MS, self._drain_ui_queue)
+
+    def _save_setting_later(self, key, value):
+        """Ставит настройку в очередь записи; изменения одного ключа до сброса сливаются в одно."""
+        with self._pending_settings_lock:
+            scheduled = bool(self._pending_settings)
+            self._pending_settings[key] = value
+        if not scheduled: self._submit_db(self._flush_pending_settings)
+
+    def _flush_pending_settings(self):
+        with self._pending_settings_lock:
+            pending, self._pending_settings = self._pending_settings, {}
+        if pending: self.db.save_settings_bulk(pending)
+
+    def _submit_db(self, fn, *args, on_error=None):
+        """Выполняет запись в БД в фоновом потоке; при ошибке или результате False вызывает on_error в UI-потоке."""
+        def _done(future):
+            error = future.exception()
+            if error is None and future.result() is not False: return
+            if error is not None: self._post_ui(self.log_action, f"Ошибка записи в БД: {error}", "ERROR")
+            if on_error: self._post_ui(on_error)
+        future = self._db_executor.submit(fn, *args)
+        future.add_done_callback(_done)
+        return future
+
+    def _remember_server(self, server):
+        """Добавляет новый сервер в список и индексы в памяти; только из UI-потока."""
+        # Новые серверы идут первыми, как в get_all_servers (ORDER BY created_at DESC)
+        self.servers.insert(0, server)
+        self._invalidate_server_views()
+        self._servers_by_id[server['id']] = server
+        self._servers_by_ip[server['ip']] = server
+        self.server_statuses[server['id']] = "idle"
+
+    def _forget_server(self, server_id):
+        """Убирает сервер из списка и индексов в памяти."""
+        self.servers = [s for s in self.servers if s["id"] != server_id]
+        self._invalidate_server_views()
+        removed = self._servers_by_id.pop(server_id, None)
+        if removed: self._servers_by_ip.pop(removed.get("ip"), None)
+        return removed
+
     def delete_server(self, server_data, dialog):
         server_id = server_data["id"]
-        self.db.delete_server(server_id)
-        self.servers = [s for s in self.servers if s["id"] != server_id]
+        position = next((i for i, s in enumerate(self.servers) if s["id"] == server_id), 0)
+        removed = self._forget_server(server_id)
+        def rollback():
+            if removed:
+                self.servers.insert(position, removed)
+                self._index_servers()
+            self.show_error(f"Не удалось удалить сервер {server_data['name']}")
+            self._mark_dirty("servers")
+        self._submit_db(self.db.delete_server, server_id, on_error=rollback)
         dialog.destroy()
         self.log_action(f"Сервер '{server_data['name']}' удален", level="WARNING")
         self.show_success(f"Сервер {server_data['name']} удален")
-        self._update_server_list()
+        self._render_server_card(server_id)
 
     def delete_domain(self, domain_info):
-        self.db.delete_domain(domain_info['domain_name'])
-        self.log_action(f"Домен {domain_info['domain_name']} удален", level="WARNING")
-        self.show_success(f"Домен {domain_info['domain_name']} удален")
-        self.refresh_data()
-        self.show_domain_tab()
-
-    def delete_domain_from_server(self, domain, server_data):
+        domain_name = domain_info['domain_name']
+        self._delete_domain_async(domain_name)
+        self.log_action(f"Домен {domain_name} удален", level="WARNING")
+        self.show_success(f"Домен {domain_name} удален")
+        self._update_domain_action_buttons()
+
+    def _delete_domain_async(self, domain_name):
+        """Удаляет домен из памяти сразу, а из БД - в фоне; при ошибке возвращает его обратно."""
+        domain_info = self._domains_by_name.get(domain_name)
+        self._forget_domains((domain_name,))
+        def rollback():
+            if domain_info:
+                self._restore_domain(domain_info)
+                if domain_info.get("server_id"): self._render_server_card(domain_info["server_id"])
+            self.show_error(f"Не удалось удалить домен {domain_name}")
+            self._render_domain_row(domain_name)
+        self._submit_db(self.db.delete_domain, domain_name, on_error=rollback)
+        self._render_domain_row(domain_name)
+
+    def _delete_domains_async(self, domain_names):
+        """Как _delete_domain_async, но для нескольких доменов одной транзакцией БД."""
+        removed = [self._domains_by_name.get(name) for name in domain_names]
+        self._forget_domains(domain_names)
+        def rollback():
+            for domain_info in removed:
+                if domain_info: self._restore_domain(domain_info)
+            for server_id in {d.get("server_id") for d in removed if d}:
+                if server_id: self._render_server_card(server_id)
+            self.show_error(f"Не удалось удалить домены ({len(domain_names)})")
+            self._mark_dirty("domain")
+        self._submit_db(self.db.delete_domains_bulk, list(domain_names), on_error=rollback)
+        for name in domain_names: self._render_domain_row(name)
+
+    def _forget_domains(self, domain_names):
+        """Убирает домены из списка, индексов и выделения в памяти за один проход по списку."""
+        removed = [self._domains_by_name.pop(name) for name in domain_names if name in self._domains_by_name]
+        if not removed: return
+        removed_ids = {id(d) for d in removed}
+        self.domains = [d for d in self.domains if id(d) not in removed_ids]
+        for server_id in {d.get("server_id") for d in removed}:
+            group = self._domains_by_server_id.get(server_id)
+            if group: group[:] = [d for d in group if id(d) not in removed_ids]
+            if server_id: self._render_server_card(server_id)
+        self.selected_domains.difference_update(domain_names)
+
+    def _restore_domain(self, domain_info):
+        """Возвращает домен в список и индексы в памяти."""
+        self.domains.append(domain_info)
+        self._domains_by_name[domain_info["domain_name"]] = domain_info
+        self._domains_by_server_id.setdefault(domain_info.get("server_id"), []).append(domain_info)
+
+    def delete_domain_from_server(self, domain, server_data, site_card=None):
         confirm_dialog = ctk.CTkToplevel(self)
         confirm_dialog.title("Подтверждение")
         confirm_dialog.geometry("350x150")
         confirm_dialog.transient(self)
         confirm_dialog.grab_set()
 
-        ctk.CTkLabel(confirm_dialog, text=f"Удалить сайт {domain['domain_name']}?", font=ctk.CTkFont(size=14)).pack(pady=20)
+        ctk.CTkLabel(confirm_dialog, text=f"Удалить сайт {domain['domain_name']}?", font=_font(size=14)).pack(pady=20)
         
         btn_frame = ctk.CTkFrame(confirm_dialog, fg_color="transparent")
         btn_frame.pack(pady=10)
 
         def do_delete():
             confirm_dialog.destroy()
-            self.db.delete_domain(domain['domain_name'])
+            self._delete_domain_async(domain['domain_name'])
             self.log_action(f"Домен {domain['domain_name']} удален с сервера {server_data['name']}", level="WARNING")
             self.show_success(f"Домен {domain['domain_name']} удален")
-            self.refresh_data()
-            self.after(100, lambda: self.show_server_management(server_data))
+            # Убираем только карточку сайта в уже открытом окне управления
+            if site_card is not None and site_card.winfo_exists():
+                sites_list = site_card.master
+                site_card.destroy()
+                if not self._domains_by_server_id.get(server_data.get("id")):
+                    ctk.CTkLabel(sites_list, text="На этом сервере нет сайтов").pack(pady=20)
 
         ctk.CTkButton(btn_frame, text="Отмена", command=confirm_dialog.destroy).pack(side="left", padx=10)
         ctk.CTkButton(btn_frame, text="Удалить", fg_color="red", command=do_delete).pack(side="left", padx=10)
@@ -473,45 +996,154 @@ class FastPanelApp(ctk.CTk):
 
         self.server_statuses[server_id] = "installing"
         self.log_action(f"Запуск установки FastPanel на сервер '{server_data['name']}'")
-        self.installation_states[server_id] = {"installing": True, "log": [], "progress": 0.0, "card": None, "log_window": None}
-        self._update_server_list()
+        self.installation_states[server_id] = {"installing": True, "log": deque(maxlen=_INSTALL_LOG_LINES), "progress": 0.0, "log_window": None}
+        self._render_server_card(server_id)
         install_thread = threading.Thread(target=self._run_installation_in_thread, args=(server_data, password, server_id), daemon=True)
         install_thread.start()
 
     def _run_installation_in_thread(self, server_data, password, server_id):
         def update_ui_callback(message, progress):
-            def _update():
-                state = self.installation_states.get(server_id)
-                if not state: return
-                state["log"].append(message)
-                state["progress"] = progress
-                if state.get("card"): state["card"].install_progress.set(progress)
-                if state.get("log_window"):
-                    state["log_window"].log_text.insert("end", message + "\n")
-                    state["log_window"].log_text.see("end")
-            self.after(0, _update)
-        service = FastPanelService()
-        result = service.install(host=server_data['ip'], username=server_data.get('ssh_user', 'root'), password=password, callback=update_ui_callback)
-        self.after(0, self._on_installation_finished, result, server_data, server_id)
+            with self._log_lock:
+                self._log_buffers.setdefault(server_id, []).append((message, progress))
+                if server_id in self._log_flush_scheduled: return
+                self._log_flush_scheduled.add(server_id)
+            self._post_ui(self.after, _LOG_FLUSH_MS, self._flush_log_buffer, server_id)
+        with self._acquire_ssh(server_data['ip'], server_data.get('ssh_user', 'root'), password) as ssh:
+            if ssh is None:
+                result = {'success': False, 'error': f"Не удалось подключиться к {server_data['ip']}"}
+                update_ui_callback(result['error'], 1.0)
+            else:
+                service = self._fastpanel_service(server_data['ip'], server_data.get('ssh_user', 'root'), ssh)
+                result = service.install(host=server_data['ip'], username=server_data.get('ssh_user', 'root'), password=password, callback=update_ui_callback)
+        self._post_ui(self._on_installation_finished, result, server_data, server_id)
+
+    def _fastpanel_service(self, host, user, ssh):
+        """Возвращает сервис FastPanel сервера, привязанный к переданному SSH соединению."""
+        with self._ssh_pool_lock:
+            service = self._fp_services.get((host, user))
+            if service is None: service = self._fp_services[(host, user)] = FastPanelService(ssh)
+        service.configure(ssh_manager=ssh, fastpanel_path=self.app_settings.get("fastpanel_path"))
+        return service
+
+    @contextmanager
+    def _acquire_ssh(self, host, user, password):
+        """Выдает живое SSH соединение из пула (или None, если подключиться не удалось)."""
+        key = (host, user)
+        self._reap_idle_ssh()
+        # Поиск в пуле и захват соединения (счетчик + снятие отметки простоя) - под одной блокировкой,
+        # иначе _reap_idle_ssh может закрыть соединение между ними
+        with self._ssh_pool_lock:
+            ssh = self._ssh_pool.get(key)
+            if ssh is not None and not ssh.is_active():
+                del self._ssh_pool[key]; ssh = None
+            if ssh is not None: self._claim_ssh(key)
+        if ssh is None:
+            ssh = SSHManager()
+            if not ssh.connect(host, user, password):
+                yield None; return
+            with self._ssh_pool_lock:
+                # Другой поток мог успеть подключиться раньше - оставляем его соединение
+                pooled = self._ssh_pool.setdefault(key, ssh)
+                self._claim_ssh(key)
+            if pooled is not ssh: ssh.disconnect(); ssh = pooled
+        try:
+            yield ssh
+        finally:
+            with self._ssh_pool_lock:
+                self._ssh_users[key] -= 1
+                if not self._ssh_users[key]:
+                    del self._ssh_users[key]
+                    self._ssh_idle_since[key] = time.monotonic()
+                if not ssh.is_active() and self._ssh_pool.get(key) is ssh: del self._ssh_pool[key]
+
+    def _claim_ssh(self, key):
+        """Отмечает соединение занятым; вызывается под _ssh_pool_lock."""
+        self._ssh_users[key] = self._ssh_users.get(key, 0) + 1
+        self._ssh_idle_since.pop(key, None)
+
+    def _schedule_ssh_reap(self):
+        """Периодически закрывает простаивающие соединения, даже если новых SSH-операций нет."""
+        # disconnect может ждать сеть - выполняем в фоне, а не в потоке UI
+        self._io_executor.submit(self._reap_idle_ssh)
+        self.after(_SSH_REAP_INTERVAL * 1000, self._schedule_ssh_reap)
+
+    def _reap_idle_ssh(self):
+        """Закрывает соединения пула, простаивающие дольше _SSH_IDLE_TIMEOUT."""
+        now = time.monotonic()
+        with self._ssh_pool_lock:
+            expired = [key for key, since in self._ssh_idle_since.items() if now - since > _SSH_IDLE_TIMEOUT]
+            stale = []
+            for key in expired:
+                del self._ssh_idle_since[key]
+                ssh = self._ssh_pool.pop(key, None)
+                if ssh is not None: stale.append(ssh)
+        for ssh in stale: ssh.disconnect()
+
+    def _flush_log_buffer(self, server_id):
+        """Выводит накопленные строки лога установки одной вставкой."""
+        with self._log_lock:
+            entries = self._log_buffers.pop(server_id, None)
+            self._log_flush_scheduled.discard(server_id)
+        state = self.installation_states.get(server_id)
+        if not entries or not state: return
+        batch = [message for message, _ in entries]
+        progress = entries[-1][1]
+        state["log"].extend(batch)
+        state["progress"] = progress
+        card = self._card_pool.get(server_id)
+        if card is not None and card.install_progress is not None: card.install_progress.set(progress)
+        log_window = state.get("log_window")
+        if log_window and log_window.state() != "normal":
+            # Свернутое окно догонит лог при разворачивании (<Map>)
+            log_window.stale = True
+        elif log_window:
+            log_text = log_window.log_text
+            log_text.insert("end", "\n".join(batch) + "\n")
+            # В окне держим только хвост лога
+            _trim_textbox(log_text, _LOG_WINDOW_LINES)
+            log_text.see("end")
 
     def _on_installation_finished(self, result, server_data, server_id):
+        self._flush_log_buffer(server_id)
         self.server_statuses[server_id] = "idle"
         if server_id in self.installation_states: self.installation_states[server_id]["installing"] = False
         if result['success']:
             self.show_success(f"FastPanel на '{server_data['name']}' успешно установлен!")
             self.log_action(f"Установка FastPanel на '{server_data['name']}' завершена успешно", level="SUCCESS")
             update_data = {"fastpanel_installed": True, "admin_url": result['admin_url'], "admin_password": result['admin_password'], "install_date": result['install_time']}
-            self.db.update_server(server_id, update_data)
-            for i, s in enumerate(self.servers):
-                if s['id'] == server_id: self.servers[i].update(update_data); break
+            self._submit_db(self.db.update_server, server_id, dict(update_data))
+            server = self._servers_by_id.get(server_id)
+            if server: server.update(update_data)
         else:
             error_message = result.get('error', 'Неизвестная ошибка')
             self.show_error("Ошибка установки!")
             self.log_action(f"Ошибка установки на '{server_data['name']}': {error_message}", level="ERROR")
-        self._update_server_list()
+        self._render_server_card(server_id)
+
+    def _mark_dirty(self, tab):
+        """Планирует перерисовку открытой вкладки, для скрытой - откладывает до ее показа."""
+        if self.current_tab != tab: self._dirty_tabs.add(tab); return
+        self._schedule_list_refresh(tab)
+
+    def _schedule_list_refresh(self, tab):
+        """Схлопывает серию запросов на перерисовку в одну."""
+        if not self._pending_list_refresh: self.after(_LIST_REFRESH_MS, self._do_list_refresh)
+        self._pending_list_refresh.add(tab)
+
+    def _do_list_refresh(self):
+        tabs, self._pending_list_refresh = self._pending_list_refresh, set()
+        for tab in tabs:
+            if self.current_tab != tab: self._dirty_tabs.add(tab)
+            elif tab == "servers": self._update_server_list()
+            else:
+                self._dirty_tabs.add(tab)
+                if tab == "domain": self.show_domain_tab()
+                elif tab == "monitoring": self.show_monitoring_tab()
 
     def refresh_data(self):
-        self.load_data_from_db()
+        self.load_data_from_db(on_loaded=self._on_data_refreshed)
+
+    def _on_data_refreshed(self):
         self.check_server_renewals()
         if self.current_tab == "servers": self.show_servers_tab()
         elif self.current_tab == "domain": self.show_domain_tab()
@@ -528,70 +1160,73 @@ class FastPanelApp(ctk.CTk):
         scrollable_form.pack(fill="both", expand=True)
         form_frame = ctk.CTkFrame(scrollable_form, fg_color=("#ffffff", "#2b2b2b"), corner_radius=10)
         form_frame.pack(fill="both", expand=True, padx=100, pady=50)
-        ctk.CTkLabel(form_frame, text="Параметры сервера", font=ctk.CTkFont(size=20, weight="bold")).pack(pady=(30, 20))
+        ctk.CTkLabel(form_frame, text="Параметры сервера", font=_font(size=20, weight="bold")).pack(pady=(30, 20))
         server_type_var = ctk.StringVar(value="new")
         if is_editing:
             server_type = "existing" if server_data.get("fastpanel_installed") else "new"
             server_type_var.set(server_type)
         radio_frame = ctk.CTkFrame(form_frame, fg_color="transparent")
         radio_frame.pack(pady=10)
-        new_radio = ctk.CTkRadioButton(radio_frame, text="Новая установка", variable=server_type_var, value="new", command=lambda: self.toggle_server_form(server_type_var.get(), form_frame, server_data if server_type_var.get() == "new" else None))
+        new_radio = ctk.CTkRadioButton(radio_frame, text="Новая установка", variable=server_type_var, value="new", command=lambda: self.toggle_server_form(server_type_var.get()))
         new_radio.pack(side="left", padx=10)
-        existing_radio = ctk.CTkRadioButton(radio_frame, text="Существующий FastPanel", variable=server_type_var, value="existing", command=lambda: self.toggle_server_form(server_type_var.get(), form_frame, server_data if server_type_var.get() == "existing" else None))
+        existing_radio = ctk.CTkRadioButton(radio_frame, text="Существующий FastPanel", variable=server_type_var, value="existing", command=lambda: self.toggle_server_form(server_type_var.get()))
         existing_radio.pack(side="left", padx=10)
         if is_editing:
              new_radio.configure(state="disabled")
              existing_radio.configure(state="disabled")
-        self.toggle_server_form(server_type_var.get(), form_frame, server_data)
-
-    def toggle_server_form(self, server_type, parent_frame, server_data=None):
-        if hasattr(self, "fields_frame"): self.fields_frame.destroy()
-        if hasattr(self, "buttons_frame"): self.buttons_frame.destroy()
-        self.fields_frame = ctk.CTkFrame(parent_frame, fg_color="transparent")
-        self.fields_frame.pack(padx=50, pady=20, fill="x", expand=True)
-        if server_type == "new": self.create_new_server_form(self.fields_frame, server_data)
-        else: self.create_existing_server_form(self.fields_frame, server_data)
-        self.buttons_frame = ctk.CTkFrame(parent_frame, fg_color="transparent")
-        self.buttons_frame.pack(pady=(10, 30))
-        ctk.CTkButton(self.buttons_frame, text="Отмена", width=120, height=40, fg_color="transparent", border_width=1, text_color=("#000000", "#ffffff"), border_color=("#e0e0e0", "#404040"), hover_color=("#f0f0f0", "#333333"), command=self.show_servers_tab).pack(side="left", padx=5)
-        ctk.CTkButton(self.buttons_frame, text="Сохранить", width=150, height=40, font=ctk.CTkFont(size=13, weight="bold"), command=lambda: self.add_or_update_server(server_type, server_data)).pack(side="left", padx=5)
+        # Обе формы строятся один раз: переключение только скрывает одну из них, введенные значения сохраняются
+        self._server_forms = {}
+        for form_type, create_form in (("new", self.create_new_server_form), ("existing", self.create_existing_server_form)):
+            fields_frame = ctk.CTkFrame(form_frame, fg_color="transparent")
+            create_form(fields_frame, server_data if form_type == server_type_var.get() else None)
+            self._server_forms[form_type] = fields_frame
+        self._server_buttons_frame = ctk.CTkFrame(form_frame, fg_color="transparent")
+        self._server_buttons_frame.pack(pady=(10, 30))
+        ctk.CTkButton(self._server_buttons_frame, text="Отмена", width=120, height=40, fg_color="transparent", border_width=1, text_color=("#000000", "#ffffff"), border_color=("#e0e0e0", "#404040"), hover_color=("#f0f0f0", "#333333"), command=self.show_servers_tab).pack(side="left", padx=5)
+        ctk.CTkButton(self._server_buttons_frame, text="Сохранить", width=150, height=40, font=_font(size=13, weight="bold"), command=lambda: self.add_or_update_server(server_type_var.get(), server_data)).pack(side="left", padx=5)
+        self.toggle_server_form(server_type_var.get())
+
+    def toggle_server_form(self, server_type):
+        for form_type, fields_frame in self._server_forms.items():
+            if form_type != server_type: fields_frame.pack_forget()
+        self._server_forms[server_type].pack(padx=50, pady=20, fill="x", expand=True, before=self._server_buttons_frame)
 
     def create_new_server_form(self, parent, data=None):
-        ctk.CTkLabel(parent, text="Название сервера", font=ctk.CTkFont(size=12), anchor="w").pack(fill="x", pady=(0, 5))
+        ctk.CTkLabel(parent, text="Название сервера", font=_font(size=12), anchor="w").pack(fill="x", pady=(0, 5))
         self.server_name_entry = ctk.CTkEntry(parent, width=400, height=40)
         self.server_name_entry.pack(pady=(0, 15), fill="x", expand=True)
         if data: self.server_name_entry.insert(0, data.get("name", ""))
-        ctk.CTkLabel(parent, text="IP адрес", font=ctk.CTkFont(size=12), anchor="w").pack(fill="x", pady=(0, 5))
+        ctk.CTkLabel(parent, text="IP адрес", font=_font(size=12), anchor="w").pack(fill="x", pady=(0, 5))
         self.server_ip_entry = ctk.CTkEntry(parent, width=400, height=40)
         self.server_ip_entry.pack(pady=(0, 15), fill="x", expand=True)
         if data: self.server_ip_entry.insert(0, data.get("ip", ""))
-        ctk.CTkLabel(parent, text="Пользователь", font=ctk.CTkFont(size=12), anchor="w").pack(fill="x", pady=(0, 5))
+        ctk.CTkLabel(parent, text="Пользователь", font=_font(size=12), anchor="w").pack(fill="x", pady=(0, 5))
         self.server_user_entry = ctk.CTkEntry(parent, width=400, height=40)
         self.server_user_entry.pack(pady=(0, 15), fill="x", expand=True)
         self.server_user_entry.insert(0, data.get("ssh_user", "root") if data else "root")
-        ctk.CTkLabel(parent, text="Пароль", font=ctk.CTkFont(size=12), anchor="w").pack(fill="x", pady=(0, 5))
+        ctk.CTkLabel(parent, text="Пароль", font=_font(size=12), anchor="w").pack(fill="x", pady=(0, 5))
         self.server_password_entry = ctk.CTkEntry(parent, width=400, height=40, show="*")
         self.server_password_entry.pack(pady=(0, 15), fill="x", expand=True)
         if data: self.server_password_entry.insert(0, data.get("password", ""))
-        ctk.CTkLabel(parent, text="Срок аренды (дней)", font=ctk.CTkFont(size=12), anchor="w").pack(fill="x", pady=(0, 5))
+        ctk.CTkLabel(parent, text="Срок аренды (дней)", font=_font(size=12), anchor="w").pack(fill="x", pady=(0, 5))
         self.hosting_period_entry = ctk.CTkEntry(parent, width=400, height=40)
         self.hosting_period_entry.pack(pady=(0, 15), fill="x", expand=True)
         self.hosting_period_entry.insert(0, str(data.get("hosting_period_days", 30)) if data else "30")
 
     def create_existing_server_form(self, parent, data=None):
-        ctk.CTkLabel(parent, text="Имя сервера", font=ctk.CTkFont(size=12), anchor="w").pack(fill="x", pady=(0, 5))
+        ctk.CTkLabel(parent, text="Имя сервера", font=_font(size=12), anchor="w").pack(fill="x", pady=(0, 5))
         self.existing_server_name_entry = ctk.CTkEntry(parent, width=400, height=40)
         self.existing_server_name_entry.pack(pady=(0, 15), fill="x", expand=True)
         if data: self.existing_server_name_entry.insert(0, data.get("name", ""))
-        ctk.CTkLabel(parent, text="URL панели (https://ip:8888)", font=ctk.CTkFont(size=12), anchor="w").pack(fill="x", pady=(0, 5))
+        ctk.CTkLabel(parent, text="URL панели (https://ip:8888)", font=_font(size=12), anchor="w").pack(fill="x", pady=(0, 5))
         self.server_url_entry = ctk.CTkEntry(parent, width=400, height=40)
         self.server_url_entry.pack(pady=(0, 15), fill="x", expand=True)
         if data: self.server_url_entry.insert(0, data.get("admin_url", ""))
-        ctk.CTkLabel(parent, text="Пароль", font=ctk.CTkFont(size=12), anchor="w").pack(fill="x", pady=(0, 5))
+        ctk.CTkLabel(parent, text="Пароль", font=_font(size=12), anchor="w").pack(fill="x", pady=(0, 5))
         self.fastuser_password_entry = ctk.CTkEntry(parent, width=400, height=40, show="*")
         self.fastuser_password_entry.pack(pady=(0, 15), fill="x", expand=True)
         if data: self.fastuser_password_entry.insert(0, data.get("admin_password", ""))
-        ctk.CTkLabel(parent, text="Срок аренды (дней)", font=ctk.CTkFont(size=12), anchor="w").pack(fill="x", pady=(0, 5))
+        ctk.CTkLabel(parent, text="Срок аренды (дней)", font=_font(size=12), anchor="w").pack(fill="x", pady=(0, 5))
         self.existing_hosting_period_entry = ctk.CTkEntry(parent, width=400, height=40)
         self.existing_hosting_period_entry.pack(pady=(0, 15), fill="x", expand=True)
         self.existing_hosting_period_entry.insert(0, str(data.get("hosting_period_days", 30)) if data else "30")
@@ -600,53 +1235,106 @@ class FastPanelApp(ctk.CTk):
         self.clear_tab_container()
         self.page_title.configure(text="Управление доменами")
         self.current_tab = "domain"
+        frame, created = self._tab_frame("domain")
+        if created:
+            action_panel = ctk.CTkFrame(frame, fg_color="transparent")
+            action_panel.pack(fill="x", pady=(0, 10))
+            ctk.CTkButton(action_panel, text="➕ Добавить домен(-ы)", command=self.show_add_domain_dialog).pack(side="left")
+            self.bind_cf_button = ctk.CTkButton(action_panel, text="🔗 Привязать к Cloudflare", state="disabled", command=self.start_cloudflare_binding)
+            self.bind_cf_button.pack(side="left", padx=10)
+            self.delete_domain_button = ctk.CTkButton(action_panel, text="🗑️ Удалить выбранные", state="disabled", fg_color=("#f44336", "#d32f2f"), hover_color=("#da190b", "#b71c1c"), command=self.confirm_delete_selected_domains)
+            self.delete_domain_button.pack(side="left", padx=10)
+            ctk.CTkButton(action_panel, text="✏️ Редактировать колонки", command=self.show_edit_columns_dialog).pack(side="left", padx=10)
+
+            self.domain_header = ctk.CTkFrame(frame, fg_color=("#e0e0e0", "#333333"), height=40)
+            self.domain_header.pack(fill="x", pady=5)
+
+            # Строки дорисовываются по мере прокрутки к нижнему краю списка
+            self.domain_list = ScrollableList(frame, _CONTENT_BG, on_near_end=self._schedule_more_domain_rows)
+            self.domain_list.pack(fill="both", expand=True)
+            self.domain_list_frame = self.domain_list.body
+        if created or "domain" in self._dirty_tabs: self._populate_domain_list()
+
+    def _populate_domain_list(self):
+        """Перестраивает шапку и строки списка доменов."""
+        self._dirty_tabs.discard("domain")
         self.domain_widgets.clear()
         self.selected_domains.clear()
-        
-        action_panel = ctk.CTkFrame(self.tab_container, fg_color="transparent")
-        action_panel.pack(fill="x", pady=(0, 10))
-        ctk.CTkButton(action_panel, text="➕ Добавить домен(-ы)", command=self.show_add_domain_dialog).pack(side="left")
-        self.bind_cf_button = ctk.CTkButton(action_panel, text="🔗 Привязать к Cloudflare", state="disabled", command=self.start_cloudflare_binding)
-        self.bind_cf_button.pack(side="left", padx=10)
-        self.delete_domain_button = ctk.CTkButton(action_panel, text="🗑️ Удалить выбранные", state="disabled", fg_color=("#f44336", "#d32f2f"), hover_color=("#da190b", "#b71c1c"), command=self.confirm_delete_selected_domains)
-        self.delete_domain_button.pack(side="left", padx=10)
-        ctk.CTkButton(action_panel, text="✏️ Редактировать колонки", command=self.show_edit_columns_dialog).pack(side="left", padx=10)
-        
-        self.domain_header = ctk.CTkFrame(self.tab_container, fg_color=("#e0e0e0", "#333333"), height=40)
-        self.domain_header.pack(fill="x", pady=5)
+        self._update_domain_action_buttons()
         self.update_domain_columns()
-        
-        domain_list_frame = ctk.CTkScrollableFrame(self.tab_container, fg_color="transparent")
-        domain_list_frame.pack(fill="both", expand=True)
-        
+        # Строки собираем в скрытом списке: одна раскладка при показе вместо пересчета на каждую строку
+        self.domain_list.pack_forget()
+        for widget in self.domain_list_frame.winfo_children(): widget.destroy()
+
+        self._domain_rows_rendered = 0
         if not self.domains:
-            ctk.CTkLabel(domain_list_frame, text="Нет добавленных доменов").pack(pady=20)
+            ctk.CTkLabel(self.domain_list_frame, text="Нет добавленных доменов").pack(pady=20)
         else:
-            for domain_info in self.domains: 
-                self.add_domain_row(domain_list_frame, domain_info)
+            self._render_more_domain_rows()
+        self.domain_list.pack(fill="both", expand=True)
+
+    def _schedule_more_domain_rows(self):
+        if self._domain_page_pending or self._domain_rows_rendered >= len(self.domains): return
+        self._domain_page_pending = True
+        self.after_idle(self._render_more_domain_rows)
+
+    def _render_more_domain_rows(self):
+        """Дорисовывает следующую страницу строк; строки создаются по мере прокрутки, а не все сразу."""
+        self._domain_page_pending = False
+        start = self._domain_rows_rendered
+        batch = self.domains[start:start + _DOMAIN_PAGE_SIZE]
+        if not batch: return
+        for domain_info in batch: self.add_domain_row(self.domain_list_frame, domain_info)
+        self._domain_rows_rendered = start + len(batch)
+
+    def _server_ip_choices(self):
+        """Варианты выбора сервера для доменов; список кэшируется до изменения серверов (не изменять)."""
+        if self._server_ip_list is None: self._server_ip_list = ["(Не выбран)"] + [s['ip'] for s in self.servers if s.get('ip')]
+        return self._server_ip_list
+
+    def _render_domain_row(self, domain_name):
+        """Перерисовывает строку одного домена вместо всей таблицы."""
+        if self.current_tab != "domain": self._dirty_tabs.add("domain"); return
+        old = self.domain_widgets.pop(domain_name, None)
+        domain_info = self._domains_by_name.get(domain_name)
+        if domain_info is not None and old is not None:
+            self.add_domain_row(self.domain_list_frame, domain_info, before=old["frame"])
+        if old is not None: old["frame"].destroy()
+        # Отрисованы строки self.domains[:_domain_rows_rendered]; удаленная строка сдвигает эту границу
+        if old is not None and domain_info is None: self._domain_rows_rendered -= 1
+        # Новый домен сразу за отрисованной частью дописываем строкой в конец; внутри нее или при
+        # пустом/опустевшем списке (там надпись-заглушка) перестраиваем вкладку целиком;
+        # домены за границей отрисуются при прокрутке
+        if not self.domains: self._mark_dirty("domain")
+        elif domain_info is not None and old is None:
+            # Новые и восстановленные домены дописываются в конец списка - обходимся без линейного поиска
+            position = len(self.domains) - 1 if self.domains[-1] is domain_info else self.domains.index(domain_info)
+            if position == self._domain_rows_rendered and position:
+                self.add_domain_row(self.domain_list_frame, domain_info)
+                self._domain_rows_rendered += 1
+            elif position <= self._domain_rows_rendered: self._mark_dirty("domain")
 
     def confirm_delete_selected_domains(self):
-        dialog = ctk.CTkToplevel(self)
-        dialog.title("Подтверждение удаления")
-        dialog.geometry("400x200")
-        dialog.transient(self)
-        dialog.grab_set()
+        dialog = self._cached_dialog("confirm_delete_domains", "Подтверждение удаления", "400x200", self._build_confirm_delete_dialog)
+        dialog.message_label.configure(text=f"Вы уверены, что хотите удалить {len(self.selected_domains)} домен(ов)?")
+
+    def _build_confirm_delete_dialog(self, dialog):
         content = ctk.CTkFrame(dialog, fg_color="transparent")
         content.pack(fill="both", expand=True, padx=30, pady=30)
-        ctk.CTkLabel(content, text="⚠️ Удаление доменов", font=ctk.CTkFont(size=18, weight="bold"), text_color=("#f44336", "#f44336")).pack(pady=(0, 20))
-        ctk.CTkLabel(content, text=f"Вы уверены, что хотите удалить {len(self.selected_domains)} домен(ов)?", font=ctk.CTkFont(size=12)).pack(pady=(0, 30))
+        ctk.CTkLabel(content, text="⚠️ Удаление доменов", font=_font(size=18, weight="bold"), text_color=("#f44336", "#f44336")).pack(pady=(0, 20))
+        dialog.message_label = ctk.CTkLabel(content, text="", font=_font(size=12))
+        dialog.message_label.pack(pady=(0, 30))
         buttons_frame = ctk.CTkFrame(content, fg_color="transparent")
         buttons_frame.pack()
-        ctk.CTkButton(buttons_frame, text="Отмена", width=100, fg_color="transparent", border_width=1, text_color=("#000000", "#ffffff"), border_color=("#e0e0e0", "#404040"), command=dialog.destroy).pack(side="left", padx=(0, 10))
+        ctk.CTkButton(buttons_frame, text="Отмена", width=100, fg_color="transparent", border_width=1, text_color=("#000000", "#ffffff"), border_color=("#e0e0e0", "#404040"), command=partial(self._hide_dialog, dialog)).pack(side="left", padx=(0, 10))
         ctk.CTkButton(buttons_frame, text="Удалить", width=100, fg_color=("#f44336", "#d32f2f"), hover_color=("#da190b", "#b71c1c"), command=lambda: self.delete_selected_domains(dialog)).pack(side="left")
 
     def delete_selected_domains(self, dialog):
-        for domain_name in list(self.selected_domains):
-            self.db.delete_domain(domain_name)
-            self.log_action(f"Домен {domain_name} удален", level="WARNING")
-        self.refresh_data()
-        self.show_domain_tab()
-        dialog.destroy()
+        domain_names = sorted(self.selected_domains)
+        self._delete_domains_async(domain_names)
+        self.log_action(f"Удалены домены: {', '.join(domain_names)}", level="WARNING")
+        self._update_domain_action_buttons()
+        self._hide_dialog(dialog)
         self.show_success(f"Выбранные домены удалены")
 
     def update_domain_columns(self):
@@ -667,120 +1355,132 @@ class FastPanelApp(ctk.CTk):
         # Чекбокс колонка
         self.domain_header.grid_columnconfigure(0, weight=0, minsize=40)
         
-        col_index = 1
-        for name, props in self.all_columns.items():
+        # Номер колонки не зависит от видимости соседних: скрытие колонки не сдвигает остальные
+        for col_index, (name, props) in enumerate(self.all_columns.items(), start=1):
             if props["visible"]:
                 self.domain_header.grid_columnconfigure(col_index, weight=props["weight"], minsize=props["min"])
-                label = ctk.CTkLabel(self.domain_header, text=name, anchor=props["anchor"], font=ctk.CTkFont(size=12, weight="bold"))
+                label = ctk.CTkLabel(self.domain_header, text=name, anchor=props["anchor"], font=_font(size=12, weight="bold"))
                 label.grid(row=0, column=col_index, padx=5, pady=5, sticky="ew")
-                col_index += 1
+            else:
+                self.domain_header.grid_columnconfigure(col_index, weight=0, minsize=0)
 
     def show_edit_columns_dialog(self):
-        dialog = ctk.CTkToplevel(self)
-        dialog.title("Редактировать колонки")
-        dialog.geometry("300x250")
-        dialog.transient(self)
-        dialog.grab_set()
-        ctk.CTkLabel(dialog, text="Выберите видимые колонки", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=15)
+        dialog = self._cached_dialog("edit_columns", "Редактировать колонки", "300x250", self._build_edit_columns_dialog)
+        for col_name, var in dialog.column_vars.items():
+            var.set(self.app_settings.get('column_visibility', {}).get(col_name, True))
+
+    def _build_edit_columns_dialog(self, dialog):
+        ctk.CTkLabel(dialog, text="Выберите видимые колонки", font=_font(size=16, weight="bold")).pack(pady=15)
         togglable_columns = ["NS-серверы Cloudflare"]
+        dialog.column_vars = {}
         for col_name in togglable_columns:
-            var = ctk.BooleanVar(value=self.app_settings.get('column_visibility', {}).get(col_name, True))
+            var = dialog.column_vars[col_name] = ctk.BooleanVar()
             cb = ctk.CTkCheckBox(dialog, text=col_name, variable=var, command=lambda name=col_name, v=var: self.toggle_column_visibility(name, v))
             cb.pack(pady=5, padx=20, anchor="w")
-        ctk.CTkButton(dialog, text="Закрыть", command=dialog.destroy).pack(pady=20)
+        ctk.CTkButton(dialog, text="Закрыть", command=partial(self._hide_dialog, dialog)).pack(pady=20)
 
     def toggle_column_visibility(self, column_name, var):
         is_visible = var.get()
         if 'column_visibility' not in self.app_settings: self.app_settings['column_visibility'] = {}
         self.app_settings['column_visibility'][column_name] = is_visible
-        self.db.save_setting('column_visibility', self.app_settings['column_visibility'])
-        self.show_domain_tab()
+        self._save_setting_later('column_visibility', dict(self.app_settings['column_visibility']))
+        # Вкладка еще не строилась - колонки применятся при первом показе
+        if "domain" not in self._tab_frames: return
+        self.update_domain_columns()
+        self._apply_ns_column_visibility()
+
+    def _apply_ns_column_visibility(self):
+        """Показывает или скрывает колонку NS в уже отрисованных строках, не перестраивая их."""
+        name = "NS-серверы Cloudflare"
+        props = self.all_columns[name]
+        col_index = list(self.all_columns).index(name) + 1
+        for domain, widgets in self.domain_widgets.items():
+            frame = widgets["frame"]
+            ns_label = widgets.get("ns_label")
+            if props["visible"]:
+                frame.grid_columnconfigure(col_index, weight=props["weight"], minsize=props["min"])
+                if ns_label is None:
+                    ns_label = widgets["ns_label"] = self._create_ns_label(frame, widgets["ns_var"])
+                ns_label.grid(row=0, column=col_index, padx=5, pady=8, sticky="ew")
+            else:
+                frame.grid_columnconfigure(col_index, weight=0, minsize=0)
+                if ns_label is not None: ns_label.grid_remove()
 
-    def add_domain_row(self, parent, domain_info):
+    def _create_ns_label(self, parent, ns_var):
+        return ctk.CTkLabel(
+            parent,
+            textvariable=ns_var,
+            anchor="center",
+            wraplength=250,
+            justify="center",
+            font=_font(size=11)
+        )
+
+    def add_domain_row(self, parent, domain_info, before=None):
         domain = domain_info["domain_name"]
         
         # Основной фрейм для строки
         domain_frame = ctk.CTkFrame(parent, fg_color=("#ffffff", "#2b2b2b"), corner_radius=5, border_width=1, border_color=("#e0e0e0", "#404040"))
-        domain_frame.pack(fill="x", pady=2)
+        domain_frame.pack(fill="x", pady=2, before=before)
         
         # Настройка колонок для строки (должна соответствовать заголовку)
         domain_frame.grid_columnconfigure(0, weight=0, minsize=40)  # Чекбокс
         
-        col_index = 1
-        visible_columns = {name: props for name, props in self.all_columns.items() if props['visible']}
-        for name, props in visible_columns.items():
-            domain_frame.grid_columnconfigure(col_index, weight=props['weight'], minsize=props['min'])
-            col_index += 1
+        for col_index, props in enumerate(self.all_columns.values(), start=1):
+            if props['visible']: domain_frame.grid_columnconfigure(col_index, weight=props['weight'], minsize=props['min'])
         
         # Чекбокс
-        var = ctk.BooleanVar()
-        checkbox = ctk.CTkCheckBox(domain_frame, text="", variable=var, width=30, command=lambda d=domain: self.toggle_domain_selection(d, var))
+        var = ctk.BooleanVar(value=domain in self.selected_domains)
+        callbacks = _DomainRowCallbacks(self, domain, var)
+        checkbox = ctk.CTkCheckBox(domain_frame, text="", variable=var, width=30, command=callbacks.on_select)
         checkbox.grid(row=0, column=0, padx=5, pady=8, sticky="w")
         
         current_col = 1
         
         # Домен (центрированный)
-        domain_label = ctk.CTkLabel(domain_frame, text=domain, font=ctk.CTkFont(size=13), anchor="center")
+        domain_label = ctk.CTkLabel(domain_frame, text=domain, font=_font(size=13), anchor="center")
         domain_label.grid(row=0, column=current_col, padx=5, pady=8, sticky="ew")
         current_col += 1
         
         # Сервер
-        server_ips = ["(Не выбран)"] + [s['ip'] for s in self.servers if s.get('ip')]
         server_ip_value = "(Не выбран)"
         if domain_info.get("server_id"):
-            server = next((s for s in self.servers if s['id'] == domain_info.get("server_id")), None)
+            server = self._servers_by_id.get(domain_info.get("server_id"))
             if server: 
                 server_ip_value = server['ip']
         
-        server_var = ctk.StringVar(value=server_ip_value)
-        server_menu = ctk.CTkOptionMenu(
-            domain_frame, 
-            values=server_ips, 
-            variable=server_var, 
+        # Кнопка открывает общее меню выбора сервера: выпадающий список со всеми IP в каждой строке не создаем
+        server_button = callbacks.server_button = ctk.CTkButton(
+            domain_frame,
+            text=f"{server_ip_value} ▾",
             width=150,
             anchor="center",
-            command=lambda ip, d=domain: self.update_domain_server(d, ip)
+            command=callbacks.on_server_menu
         )
-        server_menu.grid(row=0, column=current_col, padx=5, pady=8, sticky="ew")
+        server_button.grid(row=0, column=current_col, padx=5, pady=8, sticky="ew")
         current_col += 1
         
         # Статус Cloudflare
-        status_colors = {
-            "none": ("#666666", "#aaaaaa"),
-            "pending": ("#ff9800", "#f57c00"),
-            "active": ("#4caf50", "#2e7d32"),
-            "error": ("#f44336", "#d32f2f")
-        }
-        status_text = {
-            "none": "⚪ Не привязан",
-            "pending": "🟡 В процессе...",
-            "active": "🟢 Активен",
-            "error": "🔴 Ошибка"
-        }
+        # Текст статуса и NS живет в StringVar: обновление из привязки Cloudflare - одна запись переменной
         status = domain_info.get("cloudflare_status", "none")
+        status_var = ctk.StringVar(value=_STATUS_TEXT.get(status))
         status_label = ctk.CTkLabel(
             domain_frame,
-            text=status_text.get(status),
-            text_color=status_colors.get(status),
+            textvariable=status_var,
+            text_color=_STATUS_COLORS.get(status),
             anchor="center",
-            font=ctk.CTkFont(size=12)
+            font=_font(size=12)
         )
         status_label.grid(row=0, column=current_col, padx=5, pady=8, sticky="ew")
         current_col += 1
         
-        # NS-серверы Cloudflare (если видимы)
+        # NS-серверы Cloudflare (если видимы; колонка остается за ними и когда скрыта)
+        ns_label = None
+        ns_var = ctk.StringVar(value=domain_info.get("cloudflare_ns") or "")
         if self.all_columns["NS-серверы Cloudflare"]["visible"]:
-            ns_servers = domain_info.get("cloudflare_ns", "")
-            ns_label = ctk.CTkLabel(
-                domain_frame,
-                text=ns_servers,
-                anchor="center",
-                wraplength=250,
-                justify="center",
-                font=ctk.CTkFont(size=11)
-            )
+            ns_label = self._create_ns_label(domain_frame, ns_var)
             ns_label.grid(row=0, column=current_col, padx=5, pady=8, sticky="ew")
-            current_col += 1
+        current_col += 1
         
         # FTP кнопка
         ftp_button = ctk.CTkButton(
@@ -788,8 +1488,8 @@ class FastPanelApp(ctk.CTk):
             text="🖥️ FTP",
             width=70,
             height=28,
-            font=ctk.CTkFont(size=11),
-            command=lambda d=domain_info: self.show_ftp_credentials_dialog(d)
+            font=_font(size=11),
+            command=callbacks.on_ftp
         )
         ftp_button.grid(row=0, column=current_col, padx=5, pady=8)
         if not domain_info.get("ftp_user"):
@@ -798,17 +1498,7 @@ class FastPanelApp(ctk.CTk):
         
         # SSL кнопка
         ssl_status = domain_info.get("ssl_status", "none")
-        ssl_button = ctk.CTkButton(domain_frame, height=28, font=ctk.CTkFont(size=11))
-        
-        if ssl_status == "active":
-            ssl_button.configure(text="✅ Активен", fg_color="green", width=100, command=lambda d=domain_info: self.start_ssl_issuance(d))
-        elif ssl_status == "pending":
-            ssl_button.configure(text="⏳ Выпускается", state="disabled", width=100)
-        elif ssl_status == "error":
-            ssl_button.configure(text="❌ Ошибка", fg_color="red", width=100, command=lambda d=domain_info: self.start_ssl_issuance(d))
-        else:
-            ssl_button.configure(text="Выпустить", width=100, command=lambda d=domain_info: self.start_ssl_issuance(d))
-        
+        ssl_button = ctk.CTkButton(domain_frame, width=100, height=28, font=_font(size=11), command=callbacks.on_ssl, **_SSL_BUTTON.get(ssl_status, _SSL_BUTTON["none"]))
         ssl_button.grid(row=0, column=current_col, padx=5, pady=8)
         if not domain_info.get("server_id"):
             ssl_button.configure(state="disabled")
@@ -829,8 +1519,8 @@ class FastPanelApp(ctk.CTk):
             text="✏️",
             width=30,
             height=28,
-            font=ctk.CTkFont(size=12),
-            command=lambda d=domain_info: self.show_edit_domain_dialog(d)
+            font=_font(size=12),
+            command=callbacks.on_edit
         )
         edit_button.grid(row=0, column=1, padx=2)
         
@@ -839,10 +1529,10 @@ class FastPanelApp(ctk.CTk):
             text="🗑️",
             width=30,
             height=28,
-            font=ctk.CTkFont(size=12),
+            font=_font(size=12),
             fg_color=("#f44336", "#d32f2f"),
             hover_color=("#da190b", "#b71c1c"),
-            command=lambda d=domain_info: self.delete_domain(d)
+            command=callbacks.on_delete
         )
         delete_button.grid(row=0, column=2, padx=2)
         
@@ -850,19 +1540,53 @@ class FastPanelApp(ctk.CTk):
         self.domain_widgets[domain] = {
             "frame": domain_frame,
             "status_label": status_label,
+            "status_var": status_var,
+            "ns_var": ns_var,
             "ssl_button": ssl_button
         }
-        if self.all_columns["NS-серверы Cloudflare"]["visible"]:
-            self.domain_widgets[domain]["ns_label"] = ns_label
+        if ns_label is not None: self.domain_widgets[domain]["ns_label"] = ns_label
             
     def show_edit_domain_dialog(self, domain_info):
-        dialog = ctk.CTkToplevel(self)
-        dialog.title(f"Редактировать: {domain_info['domain_name']}")
-        dialog.geometry("600x750")  # Increased height for new fields
-        dialog.transient(self)
-        dialog.grab_set()
+        domain_name = domain_info['domain_name']
+        dialog = self._cached_dialog("edit_domain", f"Редактировать: {domain_name}", "600x750", self._build_edit_domain_dialog)
+        dialog.domain_info = domain_info
+        dialog.header_label.configure(text=f"Редактирование {domain_name}")
+
+        server_ip_value = "(Не выбран)"
+        if domain_info.get("server_id"):
+            server = self._servers_by_id.get(domain_info.get("server_id"))
+            if server:
+                server_ip_value = server['ip']
+        dialog.server_menu.configure(values=self._server_ip_choices())
+        dialog.server_var.set(server_ip_value)
 
-        ctk.CTkLabel(dialog, text=f"Редактирование {domain_info['domain_name']}", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=20)
+        # FIX: Ensure value is a string to prevent TclError
+        for entry, key in ((dialog.purchase_date_entry, "purchase_date"), (dialog.registrar_entry, "registrar")):
+            entry.delete(0, "end")
+            entry.insert(0, _text(domain_info.get(key)))
+        dialog.wp_installed_var.set(bool(domain_info.get("wordpress_installed")))
+        dialog.backup_enabled_var.set(bool(domain_info.get("backup_enabled")))
+        dialog.backup_freq_var.set(domain_info.get("backup_frequency") or "еженедельно")
+
+        dialog.ns_info_label.configure(text=_text(domain_info.get("cloudflare_ns"), "Не заданы"))
+        server_ip_for_ftp = server_ip_value if server_ip_value != "(Не выбран)" else ""
+        dialog.ftp_url_label.configure(text=f"ftp://{server_ip_for_ftp}" if server_ip_for_ftp else "Сервер не выбран")
+        dialog.ftp_user_label.configure(text=_text(domain_info.get("ftp_user"), "Нет"))
+        dialog.ftp_pass_label.configure(text=_text(domain_info.get("ftp_password"), "Нет"))
+
+        ssl_status = domain_info.get("ssl_status") if domain_info.get("ssl_status") in _SSL_BUTTON else "none"
+        dialog.ssl_button.configure(**_SSL_BUTTON[ssl_status])
+        if ssl_status == "none": dialog.ssl_button.configure(text="Выпустить сертификат", width=150)
+        else: dialog.ssl_button.configure(width=120)
+        if not domain_info.get("server_id"):
+            dialog.ssl_button.configure(state="disabled")
+
+        dialog.notes_text.delete("1.0", "end")
+        dialog.notes_text.insert("1.0", _text(domain_info.get("notes")))
+
+    def _build_edit_domain_dialog(self, dialog):
+        dialog.header_label = ctk.CTkLabel(dialog, text="", font=_font(size=16, weight="bold"))
+        dialog.header_label.pack(pady=20)
 
         scroll_frame = ctk.CTkScrollableFrame(dialog, fg_color="transparent")
         scroll_frame.pack(fill="both", expand=True)
@@ -875,151 +1599,145 @@ class FastPanelApp(ctk.CTk):
 
         # Server
         server_row = create_row(scroll_frame, "Сервер:")
-        server_ips = ["(Не выбран)"] + [s['ip'] for s in self.servers if s.get('ip')]
-        server_ip_value = "(Не выбран)"
-        if domain_info.get("server_id"):
-            server = next((s for s in self.servers if s['id'] == domain_info.get("server_id")), None)
-            if server:
-                server_ip_value = server['ip']
-        server_var = ctk.StringVar(value=server_ip_value)
-        server_menu = ctk.CTkOptionMenu(server_row, values=server_ips, variable=server_var, width=250)
-        server_menu.pack(side="left")
+        dialog.server_var = ctk.StringVar()
+        dialog.server_menu = ctk.CTkOptionMenu(server_row, values=self._server_ip_choices(), variable=dialog.server_var, width=250)
+        dialog.server_menu.pack(side="left")
 
         # Purchase Date
         purchase_date_row = create_row(scroll_frame, "Дата покупки (ГГГГ-ММ-ДД):")
-        purchase_date_entry = ctk.CTkEntry(purchase_date_row, width=250)
-        # FIX: Ensure value is a string to prevent TclError
-        purchase_date_entry.insert(0, str(domain_info.get("purchase_date") or ""))
-        purchase_date_entry.pack(side="left")
+        dialog.purchase_date_entry = ctk.CTkEntry(purchase_date_row, width=250)
+        dialog.purchase_date_entry.pack(side="left")
 
         # Registrar
         registrar_row = create_row(scroll_frame, "Регистратор:")
-        registrar_entry = ctk.CTkEntry(registrar_row, width=250)
-        registrar_entry.insert(0, str(domain_info.get("registrar") or ""))
-        registrar_entry.pack(side="left")
+        dialog.registrar_entry = ctk.CTkEntry(registrar_row, width=250)
+        dialog.registrar_entry.pack(side="left")
 
         # WordPress
         wp_row = create_row(scroll_frame, "WordPress:")
-        wp_installed_var = ctk.BooleanVar(value=domain_info.get("wordpress_installed", False))
-        wp_checkbox = ctk.CTkCheckBox(wp_row, text="Установить WordPress (заглушка)", variable=wp_installed_var)
+        dialog.wp_installed_var = ctk.BooleanVar()
+        wp_checkbox = ctk.CTkCheckBox(wp_row, text="Установить WordPress (заглушка)", variable=dialog.wp_installed_var)
         wp_checkbox.pack(side="left")
 
         # Backup
         backup_row = create_row(scroll_frame, "Резервное копирование:")
-        backup_enabled_var = ctk.BooleanVar(value=domain_info.get("backup_enabled", False))
-        backup_checkbox = ctk.CTkCheckBox(backup_row, text="Включить", variable=backup_enabled_var)
+        dialog.backup_enabled_var = ctk.BooleanVar()
+        backup_checkbox = ctk.CTkCheckBox(backup_row, text="Включить", variable=dialog.backup_enabled_var)
         backup_checkbox.pack(side="left", padx=(0, 10))
 
-        backup_freq_var = ctk.StringVar(value=domain_info.get("backup_frequency", "еженедельно"))
-        backup_freq_menu = ctk.CTkOptionMenu(backup_row, values=["ежедневно", "еженедельно", "ежемесячно"], variable=backup_freq_var)
+        dialog.backup_freq_var = ctk.StringVar()
+        backup_freq_menu = ctk.CTkOptionMenu(backup_row, values=["ежедневно", "еженедельно", "ежемесячно"], variable=dialog.backup_freq_var)
         backup_freq_menu.pack(side="left")
 
         ctk.CTkFrame(scroll_frame, height=1, fg_color=("#e0e0e0", "#404040")).pack(fill="x", padx=20, pady=15)
-        ctk.CTkLabel(scroll_frame, text="Информационные поля", font=ctk.CTkFont(size=14, weight="bold")).pack(padx=20, anchor="w")
+        ctk.CTkLabel(scroll_frame, text="Информационные поля", font=_font(size=14, weight="bold")).pack(padx=20, anchor="w")
 
         # NS Servers Info
         ns_row = create_row(scroll_frame, "NS-серверы:")
-        ns_info_label = ctk.CTkLabel(ns_row, text=str(domain_info.get("cloudflare_ns") or "Не заданы"), anchor="w")
-        ns_info_label.pack(side="left")
+        dialog.ns_info_label = ctk.CTkLabel(ns_row, text="", anchor="w")
+        dialog.ns_info_label.pack(side="left")
 
         # NEW: FTP URL
         ftp_url_row = create_row(scroll_frame, "FTP URL:")
-        server_ip_for_ftp = server_ip_value if server_ip_value != "(Не выбран)" else ""
-        ftp_url_label = ctk.CTkLabel(ftp_url_row, text=f"ftp://{server_ip_for_ftp}" if server_ip_for_ftp else "Сервер не выбран", anchor="w")
-        ftp_url_label.pack(side="left")
+        dialog.ftp_url_label = ctk.CTkLabel(ftp_url_row, text="", anchor="w")
+        dialog.ftp_url_label.pack(side="left")
 
         # FTP Info
         ftp_user_row = create_row(scroll_frame, "FTP Логин:")
-        ftp_user_label = ctk.CTkLabel(ftp_user_row, text=str(domain_info.get("ftp_user") or "Нет"), anchor="w")
-        ftp_user_label.pack(side="left")
+        dialog.ftp_user_label = ctk.CTkLabel(ftp_user_row, text="", anchor="w")
+        dialog.ftp_user_label.pack(side="left")
 
         ftp_pass_row = create_row(scroll_frame, "FTP Пароль:")
-        ftp_pass_label = ctk.CTkLabel(ftp_pass_row, text=str(domain_info.get("ftp_password") or "Нет"), anchor="w")
-        ftp_pass_label.pack(side="left")
+        dialog.ftp_pass_label = ctk.CTkLabel(ftp_pass_row, text="", anchor="w")
+        dialog.ftp_pass_label.pack(side="left")
         
         # NEW: SSL Status and Action
         ssl_row = create_row(scroll_frame, "SSL Сертификат:")
         ssl_status_frame = ctk.CTkFrame(ssl_row, fg_color="transparent")
         ssl_status_frame.pack(side="left")
-
-        ssl_status = domain_info.get("ssl_status", "none")
-        ssl_button = ctk.CTkButton(ssl_status_frame, height=28, font=ctk.CTkFont(size=11))
-        
-        if ssl_status == "active":
-            ssl_button.configure(text="✅ Активен", fg_color="green", width=120, command=lambda d=domain_info: self.start_ssl_issuance(d))
-        elif ssl_status == "pending":
-            ssl_button.configure(text="⏳ Выпускается", state="disabled", width=120)
-        elif ssl_status == "error":
-            ssl_button.configure(text="❌ Ошибка", fg_color="red", width=120, command=lambda d=domain_info: self.start_ssl_issuance(d))
-        else:
-            ssl_button.configure(text="Выпустить сертификат", width=150, command=lambda d=domain_info: self.start_ssl_issuance(d))
-        
-        ssl_button.pack(side="left")
-        if not domain_info.get("server_id"):
-            ssl_button.configure(state="disabled")
+        dialog.ssl_button = ctk.CTkButton(ssl_status_frame, width=120, height=28, font=_font(size=11), command=lambda: self.start_ssl_issuance(dialog.domain_info))
+        dialog.ssl_button.pack(side="left")
 
         # Notes
         notes_row = create_row(scroll_frame, "Комментарий:")
-        notes_text = ctk.CTkTextbox(scroll_frame, height=100)
-        notes_text.insert("1.0", domain_info.get("notes", ""))
-        notes_text.pack(fill="x", padx=20, pady=5)
-
-        def save_changes():
-            selected_server = next((s for s in self.servers if s['ip'] == server_var.get()), None)
-            updated_data = {
-                "server_id": selected_server['id'] if selected_server else None,
-                "purchase_date": purchase_date_entry.get(),
-                "registrar": registrar_entry.get(),
-                "wordpress_installed": wp_installed_var.get(),
-                "backup_enabled": backup_enabled_var.get(),
-                "backup_frequency": backup_freq_var.get(),
-                "notes": notes_text.get("1.0", "end-1c"),
-            }
-            # Auto-calculate renewal date if purchase date is provided
-            try:
-                purchase_dt = datetime.strptime(updated_data["purchase_date"], "%Y-%m-%d")
-                updated_data["renewal_date"] = (purchase_dt + timedelta(days=365)).strftime("%Y-%m-%d")
-            except ValueError:
-                updated_data["renewal_date"] = ""
-
-            self.db.update_domain(domain_info['domain_name'], updated_data)
-            self.refresh_data()
-            dialog.destroy()
-
-        ctk.CTkButton(dialog, text="Сохранить", command=save_changes).pack(pady=20)
+        dialog.notes_text = ctk.CTkTextbox(scroll_frame, height=100)
+        dialog.notes_text.pack(fill="x", padx=20, pady=5)
+
+        ctk.CTkButton(dialog, text="Сохранить", command=lambda: self._save_edit_domain_dialog(dialog)).pack(pady=20)
+
+    def _save_edit_domain_dialog(self, dialog):
+        selected_server = self._servers_by_ip.get(dialog.server_var.get())
+        updated_data = {
+            "server_id": selected_server['id'] if selected_server else None,
+            "purchase_date": dialog.purchase_date_entry.get(),
+            "registrar": dialog.registrar_entry.get(),
+            "wordpress_installed": dialog.wp_installed_var.get(),
+            "backup_enabled": dialog.backup_enabled_var.get(),
+            "backup_frequency": dialog.backup_freq_var.get(),
+            "notes": dialog.notes_text.get("1.0", "end-1c"),
+        }
+        # Auto-calculate renewal date if purchase date is provided
+        try:
+            purchase_dt = datetime.strptime(updated_data["purchase_date"], "%Y-%m-%d")
+            updated_data["renewal_date"] = (purchase_dt + timedelta(days=365)).strftime("%Y-%m-%d")
+        except ValueError:
+            updated_data["renewal_date"] = ""
+
+        domain_name = dialog.domain_info['domain_name']
+        cached = self._domains_by_name.get(domain_name)
+        snapshot = dict(cached) if cached else None
+        if cached:
+            self._move_domain_to_server(cached, updated_data["server_id"])
+            cached.update(updated_data)
+        def rollback():
+            if cached:
+                self._move_domain_to_server(cached, snapshot["server_id"])
+                cached.clear(); cached.update(snapshot)
+            self.show_error(f"Не удалось сохранить данные домена {domain_name}")
+            self._render_domain_row(domain_name)
+        self._submit_db(self.db.update_domain, domain_name, dict(updated_data), on_error=rollback)
+        self._render_domain_row(domain_name)
+        self._hide_dialog(dialog)
 
     def show_ftp_credentials_dialog(self, domain_info):
         server_ip = "N/A"
         if domain_info.get("server_id"):
-            server = next((s for s in self.servers if s['id'] == domain_info.get("server_id")), None)
+            server = self._servers_by_id.get(domain_info.get("server_id"))
             if server: server_ip = server['ip']
-        dialog = ctk.CTkToplevel(self)
-        dialog.title(f"FTP: {domain_info['domain_name']}")
-        dialog.geometry("450x250")
-        dialog.transient(self)
-        dialog.grab_set()
-        ctk.CTkLabel(dialog, text=f"FTP доступы для {domain_info['domain_name']}", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=(20, 15))
-        def copy_to_clipboard(text_to_copy):
+        dialog = self._cached_dialog("ftp", f"FTP: {domain_info['domain_name']}", "450x250", self._build_ftp_credentials_dialog)
+        dialog.header_label.configure(text=f"FTP доступы для {domain_info['domain_name']}")
+        values = (server_ip, domain_info.get("ftp_user") or "N/A", domain_info.get("ftp_password") or "N/A")
+        for entry, value_text in zip(dialog.value_entries, values):
+            entry.configure(state="normal")
+            entry.delete(0, "end")
+            entry.insert(0, value_text)
+            entry.configure(state="readonly")
+
+    def _build_ftp_credentials_dialog(self, dialog):
+        dialog.header_label = ctk.CTkLabel(dialog, text="", font=_font(size=16, weight="bold"))
+        dialog.header_label.pack(pady=(20, 15))
+        def copy_to_clipboard(value_entry):
             self.clipboard_clear()
-            self.clipboard_append(text_to_copy)
+            self.clipboard_append(value_entry.get())
             self.show_success(f"Скопировано!")
-        def create_credential_row(parent, label_text, value_text):
+        def create_credential_row(parent, label_text):
             row_frame = ctk.CTkFrame(parent, fg_color="transparent")
             row_frame.pack(fill="x", padx=20, pady=5)
             ctk.CTkLabel(row_frame, text=label_text, width=80, anchor="w").pack(side="left")
             value_entry = ctk.CTkEntry(row_frame)
-            value_entry.insert(0, value_text)
-            value_entry.configure(state="readonly")
             value_entry.pack(side="left", fill="x", expand=True, padx=(10, 5))
-            ctk.CTkButton(row_frame, text="📋", width=30, command=lambda: copy_to_clipboard(value_text)).pack(side="left")
-        create_credential_row(dialog, "Хост:", server_ip)
-        create_credential_row(dialog, "Логин:", domain_info.get("ftp_user", "N/A"))
-        create_credential_row(dialog, "Пароль:", domain_info.get("ftp_password", "N/A"))
-        ctk.CTkButton(dialog, text="Закрыть", command=dialog.destroy).pack(pady=20)
+            ctk.CTkButton(row_frame, text="📋", width=30, command=lambda: copy_to_clipboard(value_entry)).pack(side="left")
+            return value_entry
+        dialog.value_entries = [create_credential_row(dialog, label) for label in ("Хост:", "Логин:", "Пароль:")]
+        ctk.CTkButton(dialog, text="Закрыть", command=partial(self._hide_dialog, dialog)).pack(pady=20)
 
     def toggle_domain_selection(self, domain, var):
         if var.get(): self.selected_domains.add(domain)
         else: self.selected_domains.discard(domain)
+        self._update_domain_action_buttons()
+
+    def _update_domain_action_buttons(self):
+        if self.current_tab != "domain": return
         if self.selected_domains:
             self.bind_cf_button.configure(state="normal")
             self.delete_domain_button.configure(state="normal")
@@ -1028,51 +1746,65 @@ class FastPanelApp(ctk.CTk):
             self.delete_domain_button.configure(state="disabled")
 
     def update_domain_server(self, domain, server_ip):
-        server = next((s for s in self.servers if s['ip'] == server_ip), None)
+        server = self._servers_by_ip.get(server_ip)
         server_id_to_save = server['id'] if server else None
-        self.db.update_domain(domain, {"server_id": server_id_to_save})
-        for d in self.domains:
-            if d["domain_name"] == domain: d["server_id"] = server_id_to_save; break
+        self._submit_db(self.db.update_domain, domain, {"server_id": server_id_to_save})
+        domain_info = self._domains_by_name.get(domain)
+        if domain_info: self._move_domain_to_server(domain_info, server_id_to_save)
         self.log_action(f"Для домена {domain} установлен сервер {server_ip}")
         self.show_success(f"Сервер для домена обновлен")
+        self._render_domain_row(domain)
+
+    def show_domain_server_menu(self, domain, anchor):
+        """Показывает выбор сервера для домена в одном общем меню под кнопкой строки."""
+        if self._server_menu is None: self._server_menu = Menu(self, tearoff=0)
+        menu = self._server_menu
+        menu.delete(0, "end")
+        for ip in self._server_ip_choices(): menu.add_command(label=ip, command=partial(self.update_domain_server, domain, ip))
+        menu.tk_popup(anchor.winfo_rootx(), anchor.winfo_rooty() + anchor.winfo_height())
 
     def start_cloudflare_binding(self):
-        # *** ИЗМЕНЕНИЕ: Проверяем и email тоже ***
-        if not self.credentials.get("cloudflare_token") or not self.credentials.get("cloudflare_email"):
+        if self._missing_credentials(_CF_REQUIRED):
             self.show_error("Не указан API токен или E-mail для Cloudflare в настройках.")
             return
 
-        if not self.credentials.get("namecheap_user") or not self.credentials.get("namecheap_key") or not self.credentials.get("namecheap_ip"):
+        if self._missing_credentials(_NC_REQUIRED):
             self.show_error("Не указаны все данные для Namecheap в настройках.")
             return
 
+        to_bind = []
         for domain_name in self.selected_domains:
-            domain_info = next((d for d in self.domains if d["domain_name"] == domain_name), None)
+            domain_info = self._domains_by_name.get(domain_name)
             if not domain_info or not domain_info.get("server_id"):
                 self.show_error(f"Домен '{domain_name}' не ассоциирован с сервером.")
                 return
-
-        for domain_name in self.selected_domains:
-            self.update_domain_status_ui(domain_name, "pending")
-            thread = threading.Thread(target=self._bind_domain_thread, args=(domain_name,), daemon=True)
-            thread.start()
-
-    def _bind_domain_thread(self, domain_name):
+            to_bind.append((domain_name, domain_info))
+
+        cf_service, nc_service = self._api_clients()
+        for domain_name, domain_info in to_bind: self.update_domain_status_ui(domain_name, "pending")
+        self._run_bounded(self._bind_domain_thread, [(*item, cf_service, nc_service) for item in to_bind])
+
+    def _missing_credentials(self, keys):
+        """Возвращает первый незаполненный ключ учетных данных из keys или None."""
+        return next((k for k in keys if not self.credentials.get(k)), None)
+
+    def _api_clients(self):
+        """Клиенты Cloudflare и Namecheap, общие для всех привязок; пересоздаются только при смене учетных данных."""
+        key = tuple(self.credentials.get(k) for k in sorted(_CF_REQUIRED | _NC_REQUIRED))
+        if self._api_clients_cache is None or self._api_clients_cache[0] != key:
+            cf_service = CloudflareService(api_token=self.credentials.get("cloudflare_token"), email=self.credentials.get("cloudflare_email"))
+            nc_service = NamecheapService(self.credentials.get("namecheap_user"), self.credentials.get("namecheap_key"), self.credentials.get("namecheap_ip"))
+            self._api_clients_cache = (key, cf_service, nc_service)
+        return self._api_clients_cache[1:]
+
+    def _bind_domain_thread(self, domain_name, domain_info, cf_service, nc_service):
         self.log_action(f"Начата привязка домена {domain_name} к Cloudflare.")
-        domain_info = next((d for d in self.domains if d["domain_name"] == domain_name), None)
-        server = next((s for s in self.servers if s['id'] == domain_info['server_id']), None)
+        server = self._servers_by_id.get(domain_info['server_id'])
         if not server:
             self.log_action(f"Не найден сервер для домена {domain_name}.", "ERROR")
             self.update_domain_status_ui(domain_name, "error"); return
         server_ip = server["ip"]
         
-        # *** ИЗМЕНЕНИЕ: Передаем и email в сервис ***
-        cf_service = CloudflareService(
-            api_token=self.credentials.get("cloudflare_token"),
-            email=self.credentials.get("cloudflare_email")
-        )
-        nc_service = NamecheapService(self.credentials.get("namecheap_user"), self.credentials.get("namecheap_key"), self.credentials.get("namecheap_ip"))
-        
         zone_info = cf_service.add_zone(domain_name)
         if not zone_info:
             self.log_action(f"Ошибка добавления зоны {domain_name} в Cloudflare.", "ERROR")
@@ -1102,118 +1834,111 @@ class FastPanelApp(ctk.CTk):
             self.log_action("Попытка выпуска SSL без указания email в настройках.", "WARNING"); return
         self.log_action(f"Запуск выпуска SSL для домена {domain_name}")
         self.update_ssl_status_ui(domain_name, "pending")
-        thread = threading.Thread(target=self._issue_ssl_thread, args=(domain_info,), daemon=True)
-        thread.start()
+        # Выпуск длится до нескольких минут: daemon-поток не держит процесс после закрытия окна
+        threading.Thread(target=self._issue_ssl_thread, args=(domain_info,), daemon=True).start()
 
     def _issue_ssl_thread(self, domain_info):
         domain_name = domain_info['domain_name']
-        server = next((s for s in self.servers if s['id'] == domain_info['server_id']), None)
+        server = self._servers_by_id.get(domain_info['server_id'])
         if not server or not server.get('password'):
             self.log_action(f"Критическая ошибка: не найден сервер или пароль для домена {domain_name}", "ERROR")
-            self.after(0, self.update_ssl_status_ui, domain_name, "error"); return
-        service = FastPanelService()
-        if not service.ssh.connect(server['ip'], server.get('ssh_user', 'root'), server.get('password')):
-            self.log_action(f"Не удалось подключиться к серверу {server['ip']} для выпуска SSL.", "ERROR")
-            self.after(0, self.update_ssl_status_ui, domain_name, "error"); return
-        self.log_action(f"Подключились к {server['name']}, выпускаем сертификат для {domain_name}...")
-        email = self.app_settings.get("default_ssl_email")
-        result = service.issue_ssl_certificate(domain_name, email)
-        service.ssh.disconnect()
+            self.update_ssl_status_ui(domain_name, "error"); return
+        with self._acquire_ssh(server['ip'], server.get('ssh_user', 'root'), server.get('password')) as ssh:
+            if ssh is None:
+                self.log_action(f"Не удалось подключиться к серверу {server['ip']} для выпуска SSL.", "ERROR")
+                self.update_ssl_status_ui(domain_name, "error"); return
+            self.log_action(f"Подключились к {server['name']}, выпускаем сертификат для {domain_name}...")
+            email = self.app_settings.get("default_ssl_email")
+            service = self._fastpanel_service(server['ip'], server.get('ssh_user', 'root'), ssh)
+            result = service.issue_ssl_certificate(domain_name, email)
         final_status = "active" if result['success'] else "error"
         if not result['success']: self.log_action(f"Ошибка выпуска SSL для {domain_name}: {result.get('error', 'Неизвестная ошибка')}", "ERROR")
         else: self.log_action(f"SSL-сертификат для {domain_name} успешно выпущен.", "SUCCESS")
-        self.after(0, self.update_ssl_status_ui, domain_name, final_status)
+        self.update_ssl_status_ui(domain_name, final_status)
 
     def update_ssl_status_ui(self, domain_name, status):
+        # Запись ставится в очередь БД прямо из вызывающего потока; в UI-поток уходят только виджеты
+        self._submit_db(self.db.update_domain, domain_name, {"ssl_status": status})
         def _update():
-            self.db.update_domain(domain_name, {"ssl_status": status})
-            for d in self.domains:
-                if d["domain_name"] == domain_name: d["ssl_status"] = status; break
+            domain_info = self._domains_by_name.get(domain_name)
+            if domain_info: domain_info["ssl_status"] = status
             if domain_name in self.domain_widgets:
-                widgets = self.domain_widgets[domain_name]
-                ssl_button = widgets["ssl_button"]
-                
-                if status == "active":
-                    ssl_button.configure(text="Активен", fg_color="green", command=lambda d=domain_name: self.start_ssl_issuance(self.get_domain_info(d)))
-                elif status == "pending":
-                    ssl_button.configure(text="Выпускается...", state="disabled")
-                elif status == "error":
-                    ssl_button.configure(text="Ошибка", fg_color="red", command=lambda d=domain_name: self.start_ssl_issuance(self.get_domain_info(d)))
-                else:
-                    ssl_button.configure(text="Выпустить", command=lambda d=domain_name: self.start_ssl_issuance(self.get_domain_info(d)))
-
-        self.after(0, _update)
+                # Команда кнопки находит domain_info по имени в момент нажатия
+                self.domain_widgets[domain_name]["ssl_button"].configure(**_SSL_BUTTON.get(status, _SSL_BUTTON["none"]))
+
+        self._post_ui(_update)
     
     def get_domain_info(self, domain_name):
-        return next((d for d in self.domains if d['domain_name'] == domain_name), None)
+        return self._domains_by_name.get(domain_name)
 
     def update_domain_status_ui(self, domain, status, ns_servers=None):
+        update_data = {"cloudflare_status": status}
+        if ns_servers: update_data["cloudflare_ns"] = ns_servers
+        self._submit_db(self.db.update_domain, domain, update_data)
         def _update():
-            update_data = {"cloudflare_status": status}
-            if ns_servers: update_data["cloudflare_ns"] = ns_servers
-            self.db.update_domain(domain, update_data)
-            for d in self.domains:
-                if d["domain_name"] == domain:
-                    d["cloudflare_status"] = status
-                    if ns_servers: d["cloudflare_ns"] = ",".join(ns_servers)
-                    break
+            domain_info = self._domains_by_name.get(domain)
+            if domain_info:
+                domain_info["cloudflare_status"] = status
+                if ns_servers: domain_info["cloudflare_ns"] = ",".join(ns_servers)
             if domain in self.domain_widgets:
                 widget_refs = self.domain_widgets[domain]
-                status_colors = { "none": ("#666666", "#aaaaaa"), "pending": ("#ff9800", "#f57c00"), "active": ("#4caf50", "#2e7d32"), "error": ("#f44336", "#d32f2f") }
-                status_text = { "none": "⚪ Не привязан", "pending": "🟡 В процессе...", "active": "🟢 Активен", "error": "🔴 Ошибка" }
-                widget_refs["status_label"].configure(text=status_text.get(status), text_color=status_colors.get(status))
-                if ns_servers and "ns_label" in widget_refs: widget_refs["ns_label"].configure(text=", ".join(ns_servers))
-                widget_refs["frame"].update_idletasks()
-        self.after(0, _update)
+                widget_refs["status_var"].set(_STATUS_TEXT.get(status))
+                color = _STATUS_COLORS.get(status)
+                if widget_refs["status_label"].cget("text_color") != color: widget_refs["status_label"].configure(text_color=color)
+                if ns_servers: widget_refs["ns_var"].set(", ".join(ns_servers))
+        self._post_ui(_update)
 
     def show_add_domain_dialog(self):
-        dialog = ctk.CTkToplevel(self)
-        dialog.title("Добавить домены")
-        dialog.geometry("500x450")
-        dialog.transient(self)
-        dialog.grab_set()
-        ctk.CTkLabel(dialog, text="Добавить домены", font=ctk.CTkFont(size=20, weight="bold")).pack(pady=20)
-        server_ips = ["(Не выбран)"] + [s['ip'] for s in self.servers if s.get('ip')]
-        server_var = ctk.StringVar(value=server_ips[0])
+        dialog = self._cached_dialog("add_domains", "Добавить домены", "500x450", self._build_add_domain_dialog)
+        server_ips = self._server_ip_choices()
+        dialog.server_menu.configure(values=server_ips)
+        dialog.server_var.set(server_ips[0])
+        dialog.domain_textbox.delete("1.0", "end")
+
+    def _build_add_domain_dialog(self, dialog):
+        ctk.CTkLabel(dialog, text="Добавить домены", font=_font(size=20, weight="bold")).pack(pady=20)
+        dialog.server_var = ctk.StringVar()
         ctk.CTkLabel(dialog, text="Привязать к серверу:").pack()
-        server_menu = ctk.CTkOptionMenu(dialog, values=server_ips, variable=server_var)
-        server_menu.pack(pady=(0,10))
+        dialog.server_menu = ctk.CTkOptionMenu(dialog, values=self._server_ip_choices(), variable=dialog.server_var)
+        dialog.server_menu.pack(pady=(0,10))
         ctk.CTkLabel(dialog, text="Введите домены (каждый с новой строки):").pack()
-        domain_textbox = ctk.CTkTextbox(dialog, height=200, width=400)
-        domain_textbox.pack(pady=10)
-        ctk.CTkButton(dialog, text="Сохранить", command=lambda: self.add_domains(domain_textbox.get("1.0", "end-1c"), server_var.get(), dialog)).pack(pady=20)
+        dialog.domain_textbox = ctk.CTkTextbox(dialog, height=200, width=400)
+        dialog.domain_textbox.pack(pady=10)
+        ctk.CTkButton(dialog, text="Сохранить", command=lambda: self.add_domains(dialog.domain_textbox.get("1.0", "end-1c"), dialog.server_var.get(), dialog)).pack(pady=20)
 
     def add_domains(self, domains_text, server_ip, dialog):
-        dialog.destroy() # Close dialog immediately to provide user feedback
-        domains = [d.strip() for d in domains_text.split("\n") if d.strip()]
+        self._hide_dialog(dialog) # Close dialog immediately to provide user feedback
+        # Повторы во вводе отбрасываем сразу, сохраняя порядок
+        domains = list(dict.fromkeys(name for name in map(str.strip, domains_text.splitlines()) if name))
         if not domains:
             return
 
-        server = next((s for s in self.servers if s['ip'] == server_ip), None)
+        server = self._servers_by_ip.get(server_ip)
         server_id_to_save = server['id'] if server else None
         
-        added_count = 0
-        existing_domains = []
-        for domain in domains:
-            # Set default purchase date to today
-            domain_data = {
-                "domain_name": domain, 
-                "server_id": server_id_to_save,
-                "purchase_date": datetime.now().strftime("%Y-%m-%d")
-            }
-            if self.db.add_domain(domain_data):
-                added_count += 1
-            else:
-                existing_domains.append(domain)
-
-        if added_count > 0:
-            self.log_action(f"Добавлено {added_count} новых доменов.")
-            self.show_success(f"Добавлено {added_count} доменов.")
-            self.refresh_data() # This is the key change: reload all data from DB
-        
-        if existing_domains:
-            self.show_error(f"Домены уже существуют: {', '.join(existing_domains)}")
-
+        # Set default purchase date to today
+        today = datetime.now().strftime("%Y-%m-%d")
+        rows = [{"domain_name": domain, "server_id": server_id_to_save, "purchase_date": today} for domain in domains]
+
+        def on_added(future):
+            if future.exception() is None: self._post_ui(apply_added, future.result())
+        def apply_added(added):
+            # add_domains_bulk дополняет строки недостающими полями - в памяти они выглядят как строки из БД
+            added = set(added)
+            for domain_data in rows:
+                if domain_data["domain_name"] not in added: continue
+                self._restore_domain(domain_data)
+                self._render_domain_row(domain_data["domain_name"])
+            if added:
+                self.log_action(f"Добавлено {len(added)} новых доменов.")
+                self.show_success(f"Добавлено {len(added)} доменов.")
+                # Новые домены уже в памяти - перечитывать всю БД не нужно
+                if server_id_to_save: self._render_server_card(server_id_to_save)
+            existing_domains = [domain for domain in domains if domain not in added]
+            if existing_domains:
+                self.show_error(f"Домены уже существуют: {', '.join(existing_domains)}")
+
+        self._submit_db(self.db.add_domains_bulk, rows, on_error=lambda: self.show_error("Не удалось добавить домены")).add_done_callback(on_added)
 
     def show_result_tab(self):
         self.clear_tab_container()
@@ -1221,9 +1946,7 @@ class FastPanelApp(ctk.CTk):
         self.current_tab = "result"
         result_textbox = ctk.CTkTextbox(self.tab_container, wrap="word")
         result_textbox.pack(fill="both", expand=True)
-        result_text = ""
-        for server in self.servers:
-            if server.get("fastpanel_installed"): result_text += f"{server['ip']};user{server['id']};pass{server['id']}\n"
+        result_text = "".join(f"{server['ip']};user{server['id']};pass{server['id']}\n" for server in self.servers if server.get("fastpanel_installed"))
         result_textbox.insert("1.0", result_text or "Нет данных для отображения.")
         result_textbox.configure(state="disabled")
 
@@ -1237,52 +1960,75 @@ class FastPanelApp(ctk.CTk):
         self.clear_tab_container()
         self.page_title.configure(text="Настройки")
         self.current_tab = "settings"
-        tab_view = ctk.CTkTabview(self.tab_container, fg_color=("#ffffff", "#2b2b2b"))
-        tab_view.pack(fill="both", expand=True, padx=20, pady=10)
-        general_tab = tab_view.add("Общие")
-        cf_tab = tab_view.add("Cloudflare")
-        nc_tab = tab_view.add("Namecheap")
-        self._create_general_settings_tab(general_tab)
-        self._create_cloudflare_settings_tab(cf_tab)
-        self._create_namecheap_settings_tab(nc_tab)
+        frame, created = self._tab_frame("settings")
+        if created:
+            self._settings_tabview = ctk.CTkTabview(frame, fg_color=("#ffffff", "#2b2b2b"), command=self._on_settings_tab_change)
+            self._settings_tabview.pack(fill="both", expand=True, padx=20, pady=10)
+            self._settings_builders = {
+                "Общие": self._create_general_settings_tab,
+                "Cloudflare": self._create_cloudflare_settings_tab,
+                "Namecheap": self._create_namecheap_settings_tab,
+            }
+            for name in self._settings_builders: self._settings_tabview.add(name)
+            self._on_settings_tab_change()
+        self._fill_settings_entries()
+
+    def _on_settings_tab_change(self):
+        """Строит содержимое выбранной подвкладки настроек при первом ее показе."""
+        name = self._settings_tabview.get()
+        build = self._settings_builders.pop(name, None)
+        if build is None: return
+        known = set(self._settings_entries)
+        build(self._settings_tabview.tab(name))
+        self._fill_settings_entries([key for key in self._settings_entries if key not in known])
+
+    def _fill_settings_entries(self, keys=None):
+        """Заполняет поля вкладки настроек (или только поля keys) текущими значениями."""
+        defaults = {"namecheap_user": "sergeyivanov", "log_buffer_size": _LOG_BUFFER_SIZE}
+        for key in self._settings_entries if keys is None else keys:
+            entry = self._settings_entries[key]
+            source = self.credentials if key in _CRED_KEYS else self.app_settings
+            entry.delete(0, "end")
+            entry.insert(0, source.get(key) or defaults.get(key, ""))
 
     def _create_general_settings_tab(self, parent):
-        ctk.CTkLabel(parent, text="Общие настройки", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=(20, 10))
+        ctk.CTkLabel(parent, text="Общие настройки", font=_font(size=16, weight="bold")).pack(pady=(20, 10))
         self.ssl_email_entry = self._create_setting_row(parent, "Email для SSL:")
-        self.ssl_email_entry.insert(0, self.app_settings.get("default_ssl_email", ""))
+        self._settings_entries["default_ssl_email"] = self.ssl_email_entry
+        self._settings_entries["log_buffer_size"] = self._create_setting_row(parent, "Размер журнала (записей):")
         self._create_save_cancel_buttons(parent, self.save_all_settings)
 
     def _create_cloudflare_settings_tab(self, parent):
         header_frame = ctk.CTkFrame(parent, fg_color="transparent")
         header_frame.pack(fill="x", padx=20, pady=(20, 10))
-        ctk.CTkLabel(header_frame, text="Настройки Cloudflare API", font=ctk.CTkFont(size=16, weight="bold")).pack(side="left")
+        ctk.CTkLabel(header_frame, text="Настройки Cloudflare API", font=_font(size=16, weight="bold")).pack(side="left")
         ctk.CTkButton(header_frame, text="Как получить API?", command=self.show_cloudflare_instructions).pack(side="left", padx=10)
 
         # *** ИЗМЕНЕНИЕ: Добавлено поле для E-mail ***
         self.cf_email_entry = self._create_setting_row(parent, "E-mail аккаунта:")
-        self.cf_email_entry.insert(0, self.credentials.get("cloudflare_email", ""))
+        self._settings_entries["cloudflare_email"] = self.cf_email_entry
 
         self.cf_token_entry = self._create_setting_row(parent, "Global API Key:")
-        self.cf_token_entry.insert(0, self.credentials.get("cloudflare_token", ""))
         self.cf_token_entry.configure(show="*")
+        self._settings_entries["cloudflare_token"] = self.cf_token_entry
         self._create_save_cancel_buttons(parent, self.save_all_settings)
 
 
     def _create_namecheap_settings_tab(self, parent):
         header_frame = ctk.CTkFrame(parent, fg_color="transparent")
         header_frame.pack(fill="x", padx=20, pady=(20, 10))
-        ctk.CTkLabel(header_frame, text="Настройки Namecheap API", font=ctk.CTkFont(size=16, weight="bold")).pack(side="left")
+        ctk.CTkLabel(header_frame, text="Настройки Namecheap API", font=_font(size=16, weight="bold")).pack(side="left")
         ctk.CTkButton(header_frame, text="Как получить API?", command=self.show_namecheap_instructions).pack(side="left", padx=10)
 
         self.nc_user_entry = self._create_setting_row(parent, "API User:")
-        self.nc_user_entry.insert(0, self.credentials.get("namecheap_user", "sergeyivanov"))
+        self._settings_entries["namecheap_user"] = self.nc_user_entry
         self.nc_key_entry = self._create_setting_row(parent, "API Key:")
-        self.nc_key_entry.insert(0, self.credentials.get("namecheap_key", ""))
         self.nc_key_entry.configure(show="*")
+        self._settings_entries["namecheap_key"] = self.nc_key_entry
         ip_frame = self._create_setting_row(parent, "Whitelist IP:", return_frame=True)
         self.nc_ip_entry = ctk.CTkEntry(ip_frame, width=250)
         self.nc_ip_entry.pack(side="left")
-        self.nc_ip_entry.insert(0, self.credentials.get("namecheap_ip", ""))
+        self._settings_entries["namecheap_ip"] = self.nc_ip_entry
         ctk.CTkButton(ip_frame, text="Получить мой IP", width=120, command=self.fetch_public_ip).pack(side="left", padx=10)
         self._create_save_cancel_buttons(parent, self.save_all_settings)
 
@@ -1348,84 +2094,160 @@ class FastPanelApp(ctk.CTk):
 
     def _get_ip_thread(self):
         ip = NamecheapService.get_public_ip()
-        self.after(0, lambda: (self.nc_ip_entry.delete(0, "end"), self.nc_ip_entry.insert(0, ip)))
+        self._post_ui(lambda: (self.nc_ip_entry.delete(0, "end"), self.nc_ip_entry.insert(0, ip)))
 
     def save_all_settings(self):
-        # *** ИЗМЕНЕНИЕ: Сохраняем и E-mail ***
-        self.credentials["cloudflare_email"] = self.cf_email_entry.get()
-        self.credentials["cloudflare_token"] = self.cf_token_entry.get()
-        self.credentials["namecheap_user"] = self.nc_user_entry.get()
-        self.credentials["namecheap_key"] = self.nc_key_entry.get()
-        self.credentials["namecheap_ip"] = self.nc_ip_entry.get()
-        for key, value in self.credentials.items(): self.db.save_setting(key, value)
-        
-        self.app_settings["default_ssl_email"] = self.ssl_email_entry.get()
-        for key, value in self.app_settings.items(): self.db.save_setting(key, value)
+        # Пишем одной транзакцией только поля, значение которых изменилось
+        changed = {}
+        for key, entry in self._settings_entries.items():
+            target = self.credentials if key in _CRED_KEYS else self.app_settings
+            raw = entry.get()
+            # В памяти настройки хранятся декодированными (число, а не "5000") - сравниваем в том же виде
+            value = _setting_value(raw)
+            if target.get(key, "") != value:
+                target[key] = value
+                changed[key] = raw
+        if changed: self._submit_db(self.db.save_settings_bulk, changed, on_error=lambda: self.show_error("Не удалось сохранить настройки"))
+        self._apply_log_buffer_size()
         
         self.show_success("Настройки сохранены")
         self.log_action("Настройки приложения сохранены")
 
-    def load_data_from_db(self):
-        self.servers = self.db.get_all_servers()
+    def load_data_from_db(self, on_loaded=None):
+        """Перечитывает данные в потоке БД и применяет их в UI-потоке, затем вызывает on_loaded."""
+        # Чтение стоит в очереди БД после уже поставленных записей, поэтому видит их результат,
+        # а UI-поток не ждет, пока очередь разберется
+        def _done(future):
+            if future.exception() is not None:
+                self._post_ui(self.log_action, f"Ошибка загрузки данных из БД: {future.exception()}", "ERROR"); return
+            self._post_ui(self._apply_db_data, *future.result())
+            if on_loaded: self._post_ui(on_loaded)
+        self._db_executor.submit(self._read_db_data).add_done_callback(_done)
+
+    def _read_db_data(self):
+        return self.db.get_all_servers(), self.db.get_all_domains(), self.db.get_all_settings()
+
+    def _apply_db_data(self, servers, domains, settings):
+        self.servers = servers
         for server in self.servers:
             self.server_statuses[server['id']] = "idle" # Initialize all servers as idle
-        self.domains = self.db.get_all_domains()
-        all_settings = self.db.get_all_settings()
-        
-        # *** ИЗМЕНЕНИЕ: Добавляем 'cloudflare_email' в ключи credentials ***
-        cred_keys = ["cloudflare_token", "cloudflare_email", "namecheap_user", "namecheap_key", "namecheap_ip"]
-        self.credentials = {k: v for k, v in all_settings.items() if k in cred_keys}
-        self.app_settings = {k: v for k, v in all_settings.items() if k not in cred_keys}
+        self._index_servers()
+        self.domains = domains
+        self._index_domains()
+        self.credentials = {}
+        self.app_settings = {}
+        for key, value in settings.items():
+            if key in _CRED_KEYS: self.credentials[key] = value
+            else: self.app_settings[key] = value
+        self._apply_log_buffer_size()
         
         self.log_action(f"Загружено {len(self.servers)} серверов и {len(self.domains)} доменов из БД.")
 
+    def _apply_log_buffer_size(self):
+        """Применяет настройку размера журнала, сохраняя последние записи."""
+        try: size = max(100, int(self.app_settings.get("log_buffer_size") or _LOG_BUFFER_SIZE))
+        except (TypeError, ValueError): size = _LOG_BUFFER_SIZE
+        with self._logs_lock:
+            if size != self.logs.maxlen: self.logs = deque(self.logs, maxlen=size)
+
+    def _index_servers(self):
+        """Перестраивает индексы серверов по id и по IP."""
+        self._invalidate_server_views()
+        self._servers_by_id = {s["id"]: s for s in self.servers}
+        self._servers_by_ip = {s["ip"]: s for s in self.servers if s.get("ip")}
+
+    def _index_domains(self):
+        """Перестраивает индексы доменов по имени и по серверу."""
+        self._dirty_tabs.add("domain")
+        self._domains_by_name = {}
+        self._domains_by_server_id = {}
+        for d in self.domains:
+            self._domains_by_name[d["domain_name"]] = d
+            self._domains_by_server_id.setdefault(d.get("server_id"), []).append(d)
+
+    def _move_domain_to_server(self, domain_info, server_id):
+        """Меняет сервер домена в памяти, поддерживая индекс по серверу."""
+        old_server_id = domain_info.get("server_id")
+        old_group = self._domains_by_server_id.get(old_server_id)
+        if old_group: old_group.remove(domain_info)
+        domain_info["server_id"] = server_id
+        self._domains_by_server_id.setdefault(server_id, []).append(domain_info)
+        # Кнопка автоматизации на карточке зависит от наличия доменов у сервера
+        if old_server_id != server_id:
+            for affected_id in (old_server_id, server_id):
+                if affected_id: self._render_server_card(affected_id)
+
 
     def show_monitoring_tab(self):
         self.clear_tab_container()
         self.page_title.configure(text="Мониторинг серверов")
         self.current_tab = "monitoring"
-        
-        scroll_frame = ctk.CTkScrollableFrame(self.tab_container, fg_color="transparent")
-        scroll_frame.pack(fill="both", expand=True)
+        frame, created = self._tab_frame("monitoring")
+        if created:
+            self._monitoring_scroll = ctk.CTkScrollableFrame(frame, fg_color="transparent")
+            self._monitoring_scroll.pack(fill="both", expand=True)
+        if created or "monitoring" in self._dirty_tabs: self._populate_monitoring_cards()
+        self.update_monitoring_ui()
+        self._schedule_monitoring_poll()
+
+    def _populate_monitoring_cards(self):
+        """Сверяет карточки мониторинга с текущим списком серверов: создает новые и удаляет лишние."""
+        self._dirty_tabs.discard("monitoring")
+        scroll_frame = self._monitoring_scroll
+        server_ids = [server['id'] for server in self.servers]
+        for server_id in set(self.monitoring_cards).difference(server_ids):
+            self.monitoring_cards.pop(server_id)["card"].destroy()
+        if self._monitoring_empty_label is not None:
+            self._monitoring_empty_label.destroy(); self._monitoring_empty_label = None
 
         if not self.servers:
-            ctk.CTkLabel(scroll_frame, text="Нет серверов для мониторинга").pack(pady=50)
+            self._monitoring_empty_label = ctk.CTkLabel(scroll_frame, text="Нет серверов для мониторинга")
+            self._monitoring_empty_label.pack(pady=50)
+            self._monitoring_order = []
             return
-        
-        self.monitoring_cards = {}
-        for i, server in enumerate(self.servers):
-            card = ctk.CTkFrame(scroll_frame, corner_radius=10, border_width=1)
-            card.pack(fill="x", pady=5, padx=5)
-            
-            header = ctk.CTkFrame(card, fg_color="transparent")
-            header.pack(fill="x", padx=15, pady=10)
-            ctk.CTkLabel(header, text=f"🖥️ {server['name']} ({server['ip']})", font=ctk.CTkFont(size=14, weight="bold")).pack(side="left")
-
-            metrics_frame = ctk.CTkFrame(card, fg_color="transparent")
-            metrics_frame.pack(fill="x", padx=15, pady=10)
-            metrics_frame.grid_columnconfigure((0,1,2), weight=1)
-
-            def create_metric(parent, name, row, col):
-                frame = ctk.CTkFrame(parent, fg_color="transparent")
-                frame.grid(row=row, column=col, sticky="ew", padx=10)
-                label = ctk.CTkLabel(frame, text=f"{name}: 0%", font=ctk.CTkFont(size=12))
-                label.pack()
-                progress = ctk.CTkProgressBar(frame)
-                progress.set(0)
-                progress.pack(fill="x")
-                return label, progress
-            
-            cpu_label, cpu_progress = create_metric(metrics_frame, "CPU", 0, 0)
-            ram_label, ram_progress = create_metric(metrics_frame, "RAM", 0, 1)
-            disk_label, disk_progress = create_metric(metrics_frame, "Disk", 0, 2)
-
-            self.monitoring_cards[server['id']] = {
-                "card": card, "cpu_label": cpu_label, "cpu_progress": cpu_progress,
-                "ram_label": ram_label, "ram_progress": ram_progress,
-                "disk_label": disk_label, "disk_progress": disk_progress
-            }
-        
-        self.update_monitoring_ui()
+
+        for server in self.servers:
+            title = f"🖥️ {server['name']} ({server['ip']})"
+            card_widgets = self.monitoring_cards.get(server['id'])
+            if card_widgets is None: self.monitoring_cards[server['id']] = self._create_monitoring_card(scroll_frame, title)
+            elif card_widgets["title"].cget("text") != title: card_widgets["title"].configure(text=title)
+        # Перекладываем карточки только при изменении состава или порядка серверов
+        if server_ids != self._monitoring_order:
+            for server_id in server_ids: self.monitoring_cards[server_id]["card"].pack_forget()
+            for server_id in server_ids: self.monitoring_cards[server_id]["card"].pack(fill="x", pady=5, padx=5)
+            self._monitoring_order = server_ids
+
+    def _create_monitoring_card(self, parent, title):
+        card = ctk.CTkFrame(parent, corner_radius=10, border_width=1)
+
+        header = ctk.CTkFrame(card, fg_color="transparent")
+        header.pack(fill="x", padx=15, pady=10)
+        title_label = ctk.CTkLabel(header, text=title, font=_font(size=14, weight="bold"))
+        title_label.pack(side="left")
+
+        metrics_frame = ctk.CTkFrame(card, fg_color="transparent")
+        metrics_frame.pack(fill="x", padx=15, pady=10)
+        metrics_frame.grid_columnconfigure((0,1,2), weight=1)
+
+        def create_metric(parent, name, row, col):
+            frame = ctk.CTkFrame(parent, fg_color="transparent")
+            frame.grid(row=row, column=col, sticky="ew", padx=10)
+            label = ctk.CTkLabel(frame, text=f"{name}: 0%", font=_font(size=12))
+            label.pack()
+            progress = ctk.CTkProgressBar(frame)
+            progress.set(0)
+            progress.pack(fill="x")
+            return label, progress
+
+        cpu_label, cpu_progress = create_metric(metrics_frame, "CPU", 0, 0)
+        ram_label, ram_progress = create_metric(metrics_frame, "RAM", 0, 1)
+        disk_label, disk_progress = create_metric(metrics_frame, "Disk", 0, 2)
+
+        return {
+            "card": card, "title": title_label, "cpu_label": cpu_label, "cpu_progress": cpu_progress,
+            "ram_label": ram_label, "ram_progress": ram_progress,
+            "disk_label": disk_label, "disk_progress": disk_progress
+        }
 
     def update_monitoring_ui(self):
         if self.current_tab != "monitoring":
@@ -1438,6 +2260,9 @@ class FastPanelApp(ctk.CTk):
                 cpu = metrics.get('cpu', 0)
                 ram = metrics.get('ram', 0)
                 disk = metrics.get('disk', 0)
+                # Виджеты карточки перенастраиваем только при изменении значений с прошлой отрисовки
+                if card_widgets.get("rendered") == (cpu, ram, disk): continue
+                card_widgets["rendered"] = (cpu, ram, disk)
                 
                 card_widgets['cpu_label'].configure(text=f"CPU: {cpu}%")
                 card_widgets['cpu_progress'].set(cpu / 100)
@@ -1446,87 +2271,176 @@ class FastPanelApp(ctk.CTk):
                 card_widgets['disk_label'].configure(text=f"Disk: {disk}%")
                 card_widgets['disk_progress'].set(disk / 100)
 
-                if cpu > 90 or ram > 90 or disk > 90:
-                    card_widgets['card'].configure(border_color="red")
-                else:
-                    card_widgets['card'].configure(border_color=("#e0e0e0", "#404040"))
-
-    def start_monitoring(self):
-        monitor_thread = threading.Thread(target=self._monitoring_loop, daemon=True)
-        monitor_thread.start()
-
-    def _monitoring_loop(self):
-        while True:
-            for server in self.servers:
-                server_id = server['id']
-                if self.server_statuses.get(server_id) != "idle":
-                    self.log_action(f"Мониторинг сервера {server['name']} пропущен (статус: {self.server_statuses.get(server_id)})", "DEBUG")
-                    continue
-
-                if not server.get('password'): continue
-
-                self.server_statuses[server_id] = "monitoring"
-                ssh = SSHManager()
-                if ssh.connect(server['ip'], server.get('ssh_user', 'root'), server.get('password')):
-                    # CPU
-                    cpu_result = ssh.execute("top -bn1 | grep 'Cpu(s)' | sed 's/.*, *\\([0-9.]*\\)%* id.*/\\1/' | awk '{print 100 - $1}'")
-                    # RAM
-                    ram_result = ssh.execute("free | grep Mem | awk '{print $3/$2 * 100.0}'")
-                    # Disk
-                    disk_result = ssh.execute("df -h / | tail -n 1 | awk '{print $5}' | sed 's/%//'")
-                    
-                    self.server_metrics[server_id] = {
-                        'cpu': float(cpu_result.stdout.strip()) if cpu_result.success else 0,
-                        'ram': float(ram_result.stdout.strip()) if ram_result.success else 0,
-                        'disk': int(disk_result.stdout.strip()) if disk_result.success else 0,
-                    }
-                    ssh.disconnect()
-                self.server_statuses[server_id] = "idle"
-            
-            self.after(0, self.update_monitoring_ui)
-            time.sleep(3600) # 1 hour
+                alert = cpu > 90 or ram > 90 or disk > 90
+                if card_widgets.get("alert") != alert:
+                    card_widgets["alert"] = alert
+                    card_widgets['card'].configure(border_color="red" if alert else ("#e0e0e0", "#404040"))
+
+    def _start_aio_loop(self):
+        # Один поток с циклом asyncio для фоновых пачек задач (опрос серверов, привязка доменов)
+        self._aio_loop = asyncio.new_event_loop()
+        threading.Thread(target=self._aio_loop.run_forever, daemon=True).start()
+
+    def _schedule_monitoring_poll(self):
+        """Опрашивает серверы, если данные старше _MONITOR_INTERVAL, и планирует следующий опрос."""
+        if self._monitoring_job: self.after_cancel(self._monitoring_job)
+        elapsed = time.monotonic() - self._monitoring_polled_at
+        if elapsed >= _MONITOR_INTERVAL:
+            self._monitoring_polled_at = time.monotonic()
+            self._submit_coro(self._poll_all_servers())
+            elapsed = 0
+        self._monitoring_job = self.after(int((_MONITOR_INTERVAL - elapsed) * 1000), self._schedule_monitoring_poll)
+
+    def _submit_coro(self, coro):
+        """Запускает корутину в цикле мониторинга; безопасно вызывать из любого потока."""
+        return asyncio.run_coroutine_threadsafe(coro, self._aio_loop)
+
+    def _run_bounded(self, fn, items, limit=_TASK_CONCURRENCY):
+        """Выполняет блокирующую fn(*item) для каждого item в фоне, не более limit одновременно."""
+        # Ограниченная очередь с daemon-потоками вместо ThreadPoolExecutor: потоки пула ждут завершения
+        # при выходе, и закрытие приложения во время привязки висело бы до таймаутов HTTP
+        pending = queue.SimpleQueue()
+        for item in items: pending.put(item)
+        def worker():
+            while True:
+                try: item = pending.get_nowait()
+                except queue.Empty: return
+                try: fn(*item)
+                except Exception as e: self.log_action(f"Ошибка фоновой задачи: {e}", "ERROR")
+        for _ in range(min(limit, len(items))):
+            threading.Thread(target=worker, daemon=True).start()
+
+    async def _poll_all_servers(self):
+        # Серверы без пароля опросить нельзя - отсекаем их до создания задач
+        pollable = [server for server in self.servers if server.get('password')]
+        await asyncio.gather(*(self._poll_server(server) for server in pollable))
+        self._post_ui(self.update_monitoring_ui)
+
+    async def _poll_server(self, server):
+        server_id = server['id']
+        if self.server_statuses.get(server_id) != "idle":
+            self.log_action(f"Мониторинг сервера {server['name']} пропущен (статус: {self.server_statuses.get(server_id)})", "DEBUG")
+            return
+
+        self.server_statuses[server_id] = "monitoring"
+        try:
+            # SSH блокирующий - выполняем в пуле мониторинга, не задерживая цикл
+            metrics = await asyncio.get_running_loop().run_in_executor(self._monitor_executor, self._collect_server_metrics, server)
+            if metrics is not None: self.server_metrics[server_id] = metrics
+        except Exception as e:
+            self.log_action(f"Ошибка мониторинга сервера {server['name']}: {e}", "ERROR")
+        finally:
+            self.server_statuses[server_id] = "idle"
+
+    def _collect_server_metrics(self, server):
+        """Снимает загрузку CPU, RAM и диска по SSH; None, если подключиться не удалось."""
+        with self._acquire_ssh(server['ip'], server.get('ssh_user', 'root'), server.get('password')) as ssh:
+            if ssh is None: return None
+            result = ssh.execute(_METRICS_COMMAND)
+        cpu, ram, disk = ((result.stdout if result.success else "").split("\n") + ["", "", ""])[:3]
+        return {
+            'cpu': float(cpu) if cpu.strip() else 0,
+            'ram': float(ram) if ram.strip() else 0,
+            'disk': int(disk) if disk.strip() else 0,
+        }
 
     def show_logs_tab(self, level_filter="Все"):
         self.clear_tab_container()
         self.page_title.configure(text="Логи")
         self.current_tab = "logs"
-        filter_frame = ctk.CTkFrame(self.tab_container, fg_color="transparent")
-        filter_frame.pack(fill="x", pady=(0, 10))
-        levels = ["Все", "INFO", "SUCCESS", "WARNING", "ERROR"]
-        for level in levels:
-            btn = ctk.CTkButton(filter_frame, text=level, command=lambda l=level: self.show_logs_tab(l))
-            btn.pack(side="left", padx=5)
-        logs_text = ctk.CTkTextbox(self.tab_container, wrap="word")
-        logs_text.pack(fill="both", expand=True)
-        log_colors = {"INFO": "#FFFFFF", "SUCCESS": "#00C853", "WARNING": "#FFAB00", "ERROR": "#D50000"}
-        for level, color in log_colors.items(): logs_text.tag_config(level, foreground=color)
-        for log in self.logs:
-            if level_filter == "Все" or level_filter in log:
-                try:
-                    level = log.split(": ")[0].split("] ")[1]
-                    if level not in log_colors: level = "INFO"
-                    logs_text.insert("end", log + "\n", level)
-                except IndexError: logs_text.insert("end", log + "\n", "INFO")
+        frame, created = self._tab_frame("logs")
+        if created:
+            filter_frame = ctk.CTkFrame(frame, fg_color="transparent")
+            filter_frame.pack(fill="x", pady=(0, 10))
+            levels = ["Все", "INFO", "SUCCESS", "WARNING", "ERROR"]
+            for level in levels:
+                btn = ctk.CTkButton(filter_frame, text=level, command=lambda l=level: self.show_logs_tab(l))
+                btn.pack(side="left", padx=5)
+            self._logs_textbox = ctk.CTkTextbox(frame, wrap="word")
+            self._logs_textbox.pack(fill="both", expand=True)
+            for level, color in _LOG_COLORS.items(): self._logs_textbox.tag_config(level, foreground=color)
+        # При том же фильтре дописываем только новые строки
+        if not created and level_filter == self._logs_filter:
+            self._flush_logs_view(); return
+        logs_text = self._logs_textbox
+        logs_text.configure(state="normal")
+        logs_text.delete("1.0", "end")
+        # Снимок: рабочие потоки дописывают в self.logs, пока идет отрисовка
+        with self._logs_lock: entries, total = list(self.logs), self._logs_total
+        _insert_log_lines(logs_text, [entry for entry in entries if level_filter == "Все" or entry[0] == level_filter])
         logs_text.configure(state="disabled")
+        logs_text.see("end")
+        self._logs_filter = level_filter
+        self._logs_rendered = total
+
+    def _flush_logs_view(self):
+        """Дописывает в открытую вкладку логов строки, появившиеся после ее отрисовки."""
+        self._logs_flush_pending = False
+        if self.current_tab != "logs" or self._logs_textbox is None: return
+        with self._logs_lock: entries, total = list(self.logs), self._logs_total  # снимок, см. show_logs_tab
+        pending = min(total - self._logs_rendered, len(entries))
+        self._logs_rendered = total
+        new_logs = entries[len(entries) - pending:] if pending > 0 else ()
+        new_logs = [(level, log) for level, log in new_logs if self._logs_filter == "Все" or level == self._logs_filter]
+        if not new_logs: return
+        self._logs_textbox.configure(state="normal")
+        _insert_log_lines(self._logs_textbox, new_logs)
+        _trim_textbox(self._logs_textbox, self.logs.maxlen)
+        self._logs_textbox.configure(state="disabled")
+        self._logs_textbox.see("end")
 
     def _create_settings_section(self, parent, title, description):
         section = ctk.CTkFrame(parent, fg_color=("#ffffff", "#2b2b2b"), corner_radius=10)
         section.pack(fill="x", pady=10)
         header = ctk.CTkFrame(section, fg_color="transparent")
         header.pack(fill="x", padx=20, pady=(20, 10))
-        ctk.CTkLabel(header, text=title, font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w")
-        ctk.CTkLabel(header, text=description, font=ctk.CTkFont(size=11), text_color=("#666666", "#aaaaaa")).pack(anchor="w", pady=(2, 0))
+        ctk.CTkLabel(header, text=title, font=_font(size=16, weight="bold")).pack(anchor="w")
+        ctk.CTkLabel(header, text=description, font=_font(size=11), text_color=("#666666", "#aaaaaa")).pack(anchor="w", pady=(2, 0))
         return section
 
     def _add_setting_field(self, parent, label, widget):
         field_frame = ctk.CTkFrame(parent, fg_color="transparent")
         field_frame.pack(fill="x", padx=20, pady=8)
-        ctk.CTkLabel(field_frame, text=label, font=ctk.CTkFont(size=12), width=150, anchor="w").pack(side="left")
+        ctk.CTkLabel(field_frame, text=label, font=_font(size=12), width=150, anchor="w").pack(side="left")
         widget.configure(width=250)
         widget.pack(side="left", padx=(20, 0))
 
     def clear_tab_container(self):
-        for widget in self.tab_container.winfo_children(): widget.destroy()
+        # Опрос серверов нужен только открытой вкладке мониторинга
+        if self._monitoring_job: self.after_cancel(self._monitoring_job); self._monitoring_job = None
+        cached = set(self._tab_frames.values())
+        for widget in self.tab_container.winfo_children():
+            # Кэшированные вкладки не пересоздаем - только скрываем
+            if widget in cached: widget.pack_forget()
+            else: widget.destroy()
+
+    def _tab_frame(self, name):
+        """Показывает рамку вкладки, создавая ее при первом обращении; возвращает (рамка, создана ли)."""
+        frame = self._tab_frames.get(name)
+        created = frame is None
+        if created: frame = self._tab_frames[name] = ctk.CTkFrame(self.tab_container, fg_color="transparent")
+        frame.pack(fill="both", expand=True)
+        return frame, created
+
+    def _cached_dialog(self, key, title, geometry, build):
+        """Возвращает окно диалога, созданное один раз через build(dialog); закрытие его только прячет."""
+        dialog = self._dialogs.get(key)
+        if dialog is None or not dialog.winfo_exists():
+            dialog = self._dialogs[key] = ctk.CTkToplevel(self)
+            dialog.geometry(geometry)
+            dialog.transient(self)
+            dialog.protocol("WM_DELETE_WINDOW", partial(self._hide_dialog, dialog))
+            build(dialog)
+        else:
+            dialog.deiconify()
+        dialog.title(title)
+        dialog.grab_set()
+        return dialog
+
+    @staticmethod
+    def _hide_dialog(dialog):
+        dialog.grab_release()
+        dialog.withdraw()
 
     def handle_server_action(self, action, server_data):
         actions = {
@@ -1545,8 +2459,8 @@ class FastPanelApp(ctk.CTk):
         manage_window.grab_set()
         header = ctk.CTkFrame(manage_window, fg_color="transparent")
         header.pack(fill="x", padx=20, pady=20)
-        ctk.CTkLabel(header, text=f"🖥️ {server_data['name']}", font=ctk.CTkFont(size=24, weight="bold")).pack(anchor="w")
-        ctk.CTkLabel(header, text=f"IP: {server_data['ip']} | Статус: {'✅ FastPanel установлен' if server_data.get('fastpanel_installed') else '⏳ Не установлен'}", font=ctk.CTkFont(size=12), text_color=("#666666", "#aaaaaa")).pack(anchor="w", pady=(5, 0))
+        ctk.CTkLabel(header, text=f"🖥️ {server_data['name']}", font=_font(size=24, weight="bold")).pack(anchor="w")
+        ctk.CTkLabel(header, text=f"IP: {server_data['ip']} | Статус: {'✅ FastPanel установлен' if server_data.get('fastpanel_installed') else '⏳ Не установлен'}", font=_font(size=12), text_color=("#666666", "#aaaaaa")).pack(anchor="w", pady=(5, 0))
         tabview = ctk.CTkTabview(manage_window)
         tabview.pack(fill="both", expand=True, padx=20, pady=(0, 20))
         self._create_server_info_tab(tabview.add("Информация"), server_data)
@@ -1566,13 +2480,13 @@ class FastPanelApp(ctk.CTk):
             row = ctk.CTkFrame(info_content, fg_color="transparent")
             row.pack(fill="x", pady=5)
             ctk.CTkLabel(row, text=f"{label}:", width=150, anchor="w", text_color=("#666666", "#aaaaaa")).pack(side="left")
-            ctk.CTkLabel(row, text=str(value), font=ctk.CTkFont(weight="bold")).pack(side="left")
+            ctk.CTkLabel(row, text=str(value), font=_font(weight="bold")).pack(side="left")
         if data.get("fastpanel_installed"):
             fp_info = ctk.CTkFrame(info_frame, fg_color=("#ffffff", "#2b2b2b"), corner_radius=8)
             fp_info.pack(fill="x", pady=10)
             fp_content = ctk.CTkFrame(fp_info, fg_color="transparent")
             fp_content.pack(padx=20, pady=20)
-            ctk.CTkLabel(fp_content, text="FastPanel", font=ctk.CTkFont(size=14, weight="bold")).pack(anchor="w", pady=(0, 10))
+            ctk.CTkLabel(fp_content, text="FastPanel", font=_font(size=14, weight="bold")).pack(anchor="w", pady=(0, 10))
             fp_items = [("URL", data.get("admin_url", f"https://{data.get('ip')}:8888")), ("Логин", "fastuser")]
             for label, value in fp_items:
                 row = ctk.CTkFrame(fp_content, fg_color="transparent")
@@ -1595,7 +2509,7 @@ class FastPanelApp(ctk.CTk):
         sites_frame.pack(fill="both", expand=True)
         sites_list_frame = ctk.CTkScrollableFrame(sites_frame, fg_color="transparent")
         sites_list_frame.pack(fill="both", expand=True)
-        server_domains = [d for d in self.domains if d.get("server_id") == server_data.get("id")]
+        server_domains = self._domains_by_server_id.get(server_data.get("id"), ())
         if not server_domains:
             ctk.CTkLabel(sites_list_frame, text="На этом сервере нет сайтов").pack(pady=20)
         else:
@@ -1604,21 +2518,21 @@ class FastPanelApp(ctk.CTk):
                 site_card.pack(fill="x", pady=5)
                 site_content = ctk.CTkFrame(site_card, fg_color="transparent")
                 site_content.pack(padx=15, pady=12, fill="x")
-                ctk.CTkLabel(site_content, text=f"🌐 {domain_info['domain_name']}", font=ctk.CTkFont(size=14, weight="bold")).pack(side="left", anchor="w")
-                delete_button = ctk.CTkButton(site_content, text="🗑️", width=30, height=28, fg_color=("#f44336", "#d32f2f"), hover_color=("#da190b", "#b71c1c"), command=lambda d=domain_info: self.delete_domain_from_server(d, server_data))
+                ctk.CTkLabel(site_content, text=f"🌐 {domain_info['domain_name']}", font=_font(size=14, weight="bold")).pack(side="left", anchor="w")
+                delete_button = ctk.CTkButton(site_content, text="🗑️", width=30, height=28, fg_color=("#f44336", "#d32f2f"), hover_color=("#da190b", "#b71c1c"), command=lambda d=domain_info, c=site_card: self.delete_domain_from_server(d, server_data, c))
                 delete_button.pack(side="right", anchor="e")
 
     def _create_databases_tab(self, parent, server_data):
         db_frame = ctk.CTkFrame(parent, fg_color="transparent")
         db_frame.pack(fill="both", expand=True)
-        ctk.CTkLabel(db_frame, text="🗄️ Управление базами данных", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=20)
-        ctk.CTkLabel(db_frame, text="Функционал управления базами данных будет добавлен в следующей версии", font=ctk.CTkFont(size=12), text_color=("#666666", "#aaaaaa")).pack()
+        ctk.CTkLabel(db_frame, text="🗄️ Управление базами данных", font=_font(size=16, weight="bold")).pack(pady=20)
+        ctk.CTkLabel(db_frame, text="Функционал управления базами данных будет добавлен в следующей версии", font=_font(size=12), text_color=("#666666", "#aaaaaa")).pack()
 
     def _create_terminal_tab(self, parent, server_data):
         terminal_frame = ctk.CTkFrame(parent, fg_color="transparent")
         terminal_frame.pack(fill="both", expand=True)
-        ctk.CTkLabel(terminal_frame, text="SSH Терминал", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=20)
-        ctk.CTkLabel(terminal_frame, text="Функционал терминала будет добавлен в следующей версии", font=ctk.CTkFont(size=12), text_color=("#666666", "#aaaaaa")).pack()
+        ctk.CTkLabel(terminal_frame, text="SSH Терминал", font=_font(size=16, weight="bold")).pack(pady=20)
+        ctk.CTkLabel(terminal_frame, text="Функционал терминала будет добавлен в следующей версии", font=_font(size=12), text_color=("#666666", "#aaaaaa")).pack()
 
     def confirm_delete_server(self, server_data):
         dialog = ctk.CTkToplevel(self)
@@ -1628,8 +2542,8 @@ class FastPanelApp(ctk.CTk):
         dialog.grab_set()
         content = ctk.CTkFrame(dialog, fg_color="transparent")
         content.pack(fill="both", expand=True, padx=30, pady=30)
-        ctk.CTkLabel(content, text="⚠️ Удаление сервера", font=ctk.CTkFont(size=18, weight="bold"), text_color=("#f44336", "#f44336")).pack(pady=(0, 20))
-        ctk.CTkLabel(content, text=f"Вы уверены, что хотите удалить сервер\n{server_data['name']} ({server_data['ip']})?", font=ctk.CTkFont(size=12)).pack(pady=(0, 30))
+        ctk.CTkLabel(content, text="⚠️ Удаление сервера", font=_font(size=18, weight="bold"), text_color=("#f44336", "#f44336")).pack(pady=(0, 20))
+        ctk.CTkLabel(content, text=f"Вы уверены, что хотите удалить сервер\n{server_data['name']} ({server_data['ip']})?", font=_font(size=12)).pack(pady=(0, 30))
         buttons_frame = ctk.CTkFrame(content, fg_color="transparent")
         buttons_frame.pack()
         ctk.CTkButton(buttons_frame, text="Отмена", width=100, fg_color="transparent", border_width=1, text_color=("#000000", "#ffffff"), border_color=("#e0e0e0", "#404040"), command=dialog.destroy).pack(side="left", padx=(0, 10))
@@ -1643,10 +2557,10 @@ class FastPanelApp(ctk.CTk):
         dialog.grab_set()
         content = ctk.CTkFrame(dialog, fg_color="transparent")
         content.pack(fill="both", expand=True, padx=30, pady=30)
-        ctk.CTkLabel(content, text="Пароль администратора FastPanel:", font=ctk.CTkFont(size=12)).pack(pady=(0, 10))
+        ctk.CTkLabel(content, text="Пароль администратора FastPanel:", font=_font(size=12)).pack(pady=(0, 10))
         password_frame = ctk.CTkFrame(content, fg_color=("#f5f5f5", "#1a1a1a"), corner_radius=5)
         password_frame.pack(fill="x", pady=10)
-        ctk.CTkLabel(password_frame, text=password, font=ctk.CTkFont(family="Courier", size=14, weight="bold")).pack(padx=10, pady=10)
+        ctk.CTkLabel(password_frame, text=password, font=_font(family="Courier", size=14, weight="bold")).pack(padx=10, pady=10)
         ctk.CTkButton(content, text="Закрыть", width=100, command=dialog.destroy).pack(pady=(10, 0))
 
     def show_log_window(self, server_data):
@@ -1660,44 +2574,91 @@ class FastPanelApp(ctk.CTk):
         state["log_window"] = log_window
         log_window.log_text = ctk.CTkTextbox(log_window, wrap="word")
         log_window.log_text.pack(fill="both", expand=True, padx=10, pady=(10,0))
-        log_window.log_text.insert("1.0", "\n".join(state["log"]))
-        log_window.log_text.see("end")
+        log_window.stale = False
+        self._render_log_tail(log_window, state["log"])
+        def on_map(event):
+            if event.widget is log_window and log_window.stale:
+                log_window.stale = False
+                self._render_log_tail(log_window, state["log"])
+        log_window.bind("<Map>", on_map)
         def copy_log():
             self.clipboard_clear()
-            self.clipboard_append(log_window.log_text.get("1.0", "end"))
-        ctk.CTkButton(log_window, text="Копировать лог", command=copy_log).pack(pady=10)
+            self.clipboard_append("\n".join(state["log"]))
+        def save_full_log():
+            # Полный лог остается в памяти; на диск попадает только по явному запросу - в нем есть пароль администратора
+            path = filedialog.asksaveasfilename(parent=log_window, title="Сохранить лог установки", defaultextension=".log",
+                                                initialfile=f"install_{server_data['name']}.log", filetypes=[("Лог", "*.log"), ("Все файлы", "*.*")])
+            if not path: return
+            try:
+                with open(path, "w", encoding="utf-8") as f: f.write("\n".join(state["log"]))
+            except OSError as e:
+                self.show_error(f"Не удалось сохранить лог: {e}"); return
+            self.show_success(f"Лог сохранен: {path}")
+        buttons = ctk.CTkFrame(log_window, fg_color="transparent")
+        buttons.pack(pady=10)
+        ctk.CTkButton(buttons, text="Копировать лог", command=copy_log).pack(side="left", padx=5)
+        ctk.CTkButton(buttons, text="Сохранить полный лог...", command=save_full_log).pack(side="left", padx=5)
         def on_close():
             state["log_window"] = None
             log_window.destroy()
         log_window.protocol("WM_DELETE_WINDOW", on_close)
 
+    def _render_log_tail(self, log_window, log_lines):
+        """Показывает в окне лога последние _LOG_WINDOW_LINES строк."""
+        tail = list(islice(log_lines, max(0, len(log_lines) - _LOG_WINDOW_LINES), None))
+        log_window.log_text.delete("1.0", "end")
+        if tail: log_window.log_text.insert("1.0", "\n".join(tail) + "\n")
+        log_window.log_text.see("end")
+
     def log_action(self, message, level="INFO"):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.logs.append(f"[{timestamp}] {level}: {message}")
-        if self.current_tab == "logs": self.show_logs_tab()
+        second = int(time.time())
+        with self._logs_lock:
+            cached_second, timestamp = self._ts_cache
+            if second != cached_second:
+                timestamp = datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+                self._ts_cache = (second, timestamp)
+            self.logs.append((level, f"[{timestamp}] {level}: {message}"))
+            self._logs_total += 1
+            schedule = self.current_tab == "logs" and not self._logs_flush_pending
+            if schedule: self._logs_flush_pending = True
+        if schedule: self._post_ui(self.after, _LOG_FLUSH_MS, self._flush_logs_view)
 
     def show_success(self, message):
-        self.status_label.configure(text=f"✅ {message}", text_color=("#4caf50", "#4caf50"))
-        self.after(3000, lambda: self.status_label.configure(text="● Готов к работе", text_color=("#4caf50", "#4caf50")))
+        self.status_label.configure(text=f"✅ {message}", text_color=_OK_COLOR)
+        self._schedule_status_reset()
 
     def show_error(self, message):
-        self.status_label.configure(text=f"❌ {message}", text_color=("#f44336", "#f44336"))
+        self.status_label.configure(text=f"❌ {message}", text_color=_ERR_COLOR)
         self.log_action(message, level="ERROR")
-        self.after(3000, lambda: self.status_label.configure(text="● Готов к работе", text_color=("#4caf50", "#4caf50")))
+        self._schedule_status_reset()
+
+    def _schedule_status_reset(self):
+        # Новое сообщение продлевает показ, а не ставит еще один сброс
+        if self._status_reset_job: self.after_cancel(self._status_reset_job)
+        self._status_reset_job = self.after(3000, self._reset_status)
+
+    def _reset_status(self):
+        self._status_reset_job = None
+        self.status_label.configure(text=_STATUS_READY, text_color=_OK_COLOR)
     
     def check_server_renewals(self):
+        """Считает истекающие серверы в фоне и обновляет кнопку навигации в UI-потоке."""
+        future = self._io_executor.submit(self._count_expiring_servers, list(self.servers))
+        future.add_done_callback(lambda f: self._post_ui(self._apply_renewal_results, f.result()))
+
+    @staticmethod
+    def _count_expiring_servers(servers):
         expiring_servers = 0
         today = datetime.now()
-        for server in self.servers:
+        for server in servers:
             try:
-                created_at = datetime.strptime(server['created_at'].split("T")[0], "%Y-%m-%d")
-                period = timedelta(days=int(server.get('hosting_period_days', 30)))
-                renewal_date = created_at + period
-                if (renewal_date - today).days <= 3:
+                if (_renewal_date(server['created_at'], server.get('hosting_period_days', 30)) - today).days <= 3:
                     expiring_servers += 1
-            except (ValueError, TypeError):
+            except (ValueError, TypeError, KeyError):
                 continue
-        
+        return expiring_servers
+
+    def _apply_renewal_results(self, expiring_servers):
         btn = self.nav_buttons["Серверы"]
         if expiring_servers > 0:
             btn.configure(text=f"🖥️ Серверы 🔔({expiring_servers})")
@@ -1710,7 +2671,8 @@ class FastPanelApp(ctk.CTk):
         self.server_statuses[server_id] = "automating"
         self.log_action(f"Запуск автоматизации для сервера '{server_data['name']}'")
         self.show_success(f"Автоматизация для '{server_data['name']}' запущена...")
-        server_domains = [d for d in self.domains if d.get("server_id") == server_data.get("id")]
+        # Копия группы: поток автоматизации не должен видеть последующих изменений индекса
+        server_domains = list(self._domains_by_server_id.get(server_data.get("id"), ()))
         if not server_domains:
             self.log_action(f"На сервере '{server_data['name']}' нет привязанных доменов.", level="WARNING")
             self.show_error("Нет доменов для автоматизации"); return
@@ -1721,44 +2683,87 @@ class FastPanelApp(ctk.CTk):
     def _run_automation_in_thread(self, server_data, domains_to_process, progress_window):
         server_id = server_data['id']
         def progress_callback(message):
-            self.after(0, progress_window.add_log, message)
+            progress_window.add_log(message)
             self.log_action(message)
         progress_callback(f"Всего доменов для автоматизации: {len(domains_to_process)}")
-        service = FastPanelService(fastpanel_path=self.app_settings.get("fastpanel_path"))
-        if not service.ssh.connect(server_data['ip'], server_data.get('ssh_user', 'root'), server_data.get('password')):
-            progress_callback(f"КРИТИЧЕСКАЯ ОШИБКА: Не удалось подключиться к серверу {server_data['ip']}.")
-            self.log_action(f"SSH-соединение не установлено для {server_data['name']}", "ERROR")
-            self.after(0, progress_window.destroy)
-            self.server_statuses[server_id] = "idle"
-            return
-        progress_callback("SSH-соединение успешно установлено.")
-        for domain_info in domains_to_process:
-            progress_callback(f"--- Начало работы с доменом: {domain_info['domain_name']} ---")
-            domain_info_adapted = {'domain_name': domain_info['domain_name']}
+        with self._acquire_ssh(server_data['ip'], server_data.get('ssh_user', 'root'), server_data.get('password')) as ssh:
+            if ssh is None:
+                progress_callback(f"КРИТИЧЕСКАЯ ОШИБКА: Не удалось подключиться к серверу {server_data['ip']}.")
+                self.log_action(f"SSH-соединение не установлено для {server_data['name']}", "ERROR")
+                self._post_ui(progress_window.destroy)
+                self.server_statuses[server_id] = "idle"
+                return
+            service = self._fastpanel_service(server_data['ip'], server_data.get('ssh_user', 'root'), ssh)
+            progress_callback("SSH-соединение успешно установлено.")
             ssl_email = self.app_settings.get("default_ssl_email")
-            updated_data = service.run_domain_automation(domain_info_adapted, server_data, progress_callback, ssl_email)
-            self.after(0, self._update_domain_data, updated_data)
-            self.after(0, progress_window.increment_progress)
-        service.ssh.disconnect()
+            def process_domain(domain_info):
+                progress_callback(f"--- Начало работы с доменом: {domain_info['domain_name']} ---")
+                domain_info_adapted = {'domain_name': domain_info['domain_name']}
+                result = service.run_domain_automation(domain_info_adapted, server_data, progress_callback, ssl_email)
+                self._post_ui(progress_window.increment_progress)
+                return result
+            # Домены независимы: обрабатываем несколько сразу, каждый в своем канале общего SSH соединения
+            # sites/ftp_account идут параллельно; выпуск SSL (certbot) сервис выполняет по одному на сервер
+            try: workers = min(max(1, int(self.app_settings.get("ssh_concurrency") or _SSH_SESSIONS)), _SSH_SESSIONS_MAX)
+            except (TypeError, ValueError): workers = _SSH_SESSIONS
+            # Результаты сохраняются пачками по мере готовности, каждая пачка - одной транзакцией
+            batch, saved_at = [], time.monotonic()
+            # Домены с ошибкой: сайт не создан, исключение или не выпущен SSL - попадут в итоговое сообщение
+            failed = []
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="automation") as pool:
+                futures = {pool.submit(process_domain, d): d['domain_name'] for d in domains_to_process}
+                for future in as_completed(futures):
+                    if future.exception() is not None:
+                        progress_callback(f"Ошибка автоматизации домена: {future.exception()}")
+                        failed.append(futures[future])
+                    else:
+                        result = future.result()
+                        if not result.get("site_user") or result.get("ssl_status") == "error": failed.append(futures[future])
+                        batch.append(result)
+                    if batch and (len(batch) >= _AUTOMATION_SAVE_BATCH or time.monotonic() - saved_at >= _AUTOMATION_SAVE_INTERVAL):
+                        self._post_ui(self._update_domains_data, batch)
+                        batch, saved_at = [], time.monotonic()
+            if batch: self._post_ui(self._update_domains_data, batch)
         progress_callback("--- Автоматизация завершена ---")
-        self.log_action(f"Автоматизация для сервера '{server_data['name']}' завершена.", "SUCCESS")
         self.server_statuses[server_id] = "idle"
-        self.after(5000, progress_window.destroy)
-
-    def _update_domain_data(self, updated_domain_info):
-        domain_name = updated_domain_info.get("domain_name")
-        if not domain_name: return
-        self.db.update_domain(domain_name, updated_domain_info)
-        for i, d in enumerate(self.domains):
-            if d.get('domain_name') == domain_name: self.domains[i].update(updated_domain_info); break
-        if self.current_tab == "domain": self.show_domain_tab()
+        # Окно с накопленным логом закрываем сразу; о завершении сообщает строка статуса (лог остается во вкладке логов)
+        self._post_ui(progress_window.destroy)
+        if failed:
+            self.log_action(f"Автоматизация для сервера '{server_data['name']}' завершена с ошибками: {', '.join(sorted(failed))}", "ERROR")
+            self._post_ui(self.show_error, f"Автоматизация для '{server_data['name']}': ошибки в {len(failed)} из {len(domains_to_process)} доменов (см. логи)")
+        else:
+            self.log_action(f"Автоматизация для сервера '{server_data['name']}' завершена.", "SUCCESS")
+            self._post_ui(self.show_success, f"Автоматизация для '{server_data['name']}' завершена")
+
+    def _update_domains_data(self, updated_results):
+        """Применяет результаты автоматизации в памяти и пишет их в БД одной транзакцией."""
+        updates, snapshots = {}, {}
+        for updated_domain_info in updated_results:
+            domain_name = updated_domain_info.get("domain_name")
+            if not domain_name: continue
+            domain_info = self._domains_by_name.get(domain_name)
+            if domain_info:
+                snapshots[domain_name] = dict(domain_info)
+                domain_info.update(updated_domain_info)
+            updates[domain_name] = dict(updated_domain_info)
+        if not updates: return
+        def rollback():
+            for domain_name, snapshot in snapshots.items():
+                domain_info = self._domains_by_name.get(domain_name)
+                if domain_info: domain_info.clear(); domain_info.update(snapshot)
+                self._render_domain_row(domain_name)
+            self.show_error(f"Не удалось сохранить данные доменов ({len(updates)})")
+        self._submit_db(self.db.update_domains_bulk, updates, on_error=rollback)
+        for domain_name in updates: self._render_domain_row(domain_name)
     
     def show_bulk_add_tab(self):
         self.clear_tab_container()
         self.page_title.configure(text="Массовое добавление")
         self.current_tab = "bulk_add"
+        frame, created = self._tab_frame("bulk_add")
+        if not created: return
 
-        tab_view = ctk.CTkTabview(self.tab_container, fg_color=("#ffffff", "#2b2b2b"))
+        tab_view = ctk.CTkTabview(frame, fg_color=("#ffffff", "#2b2b2b"))
         tab_view.pack(fill="both", expand=True, padx=20, pady=10)
         
         new_server_tab = tab_view.add("Новые серверы")
@@ -1774,7 +2779,7 @@ class FastPanelApp(ctk.CTk):
         upload_frame = ctk.CTkFrame(parent)
         upload_frame.pack(fill="x", pady=10)
 
-        ctk.CTkLabel(upload_frame, text="Загрузка файла с данными", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=10)
+        ctk.CTkLabel(upload_frame, text="Загрузка файла с данными", font=_font(size=16, weight="bold")).pack(pady=10)
         ctk.CTkButton(upload_frame, text="Выбрать файл (.csv, .xlsx)", command=lambda: self._select_file(import_type)).pack(pady=10)
         
         self.bulk_add_widgets[import_type]['skip_header_var'] = ctk.BooleanVar(value=False)
@@ -1804,7 +2809,7 @@ class FastPanelApp(ctk.CTk):
         # Блок 2: Предварительный просмотр
         preview_frame = ctk.CTkFrame(parent)
         preview_frame.pack(fill="both", expand=True, pady=10)
-        ctk.CTkLabel(preview_frame, text="Предварительный просмотр", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=10)
+        ctk.CTkLabel(preview_frame, text="Предварительный просмотр", font=_font(size=16, weight="bold")).pack(pady=10)
         
         self.bulk_add_widgets[import_type]['summary_label'] = ctk.CTkLabel(preview_frame, text="")
         self.bulk_add_widgets[import_type]['summary_label'].pack(pady=5)
@@ -1883,9 +2888,7 @@ class FastPanelApp(ctk.CTk):
             if len(row) < 4 or not all(row[:4]):
                 return "error", "Отсутствуют обязательные данные (Домен, IP, Логин, Пароль)"
             domain, ip, login, password, server_name = (row + [""] * 5)[:5]
-            try:
-                ipaddress.ip_address(ip)
-            except ValueError:
+            if not _is_valid_ip(ip):
                 return "error", "Неверный формат IP-адреса"
 
         else: # existing_fp
@@ -1915,10 +2918,11 @@ class FastPanelApp(ctk.CTk):
         added_domains = 0
         created_servers = 0
         errors = 0
+        created = {}  # ip -> id серверов, созданных этим импортом, пока UI-поток их не проиндексировал
 
         for i, row in enumerate(data_to_import):
             try:
-                server_id, is_new = self._get_or_create_server(row, import_type)
+                server_id, is_new = self._get_or_create_server(row, import_type, created)
                 if is_new:
                     created_servers += 1
                 
@@ -1928,19 +2932,20 @@ class FastPanelApp(ctk.CTk):
                 errors += 1
                 self.log_action(f"Ошибка импорта строки: {row}. Ошибка: {e}", "ERROR")
 
-            self.after(0, widgets['progress_bar'].set, (i + 1) / total)
+            self._post_ui(widgets['progress_bar'].set, (i + 1) / total)
         
-        self.after(0, self._show_import_results, added_domains, created_servers, errors, import_type)
+        self._post_ui(self._show_import_results, added_domains, created_servers, errors, import_type)
 
-    def _get_or_create_server(self, row, import_type):
+    def _get_or_create_server(self, row, import_type, created):
         if import_type == "new_server":
             ip = row[1]
-            server = next((s for s in self.servers if s['ip'] == ip), None)
+            if ip in created: return created[ip], False
+            server = self._servers_by_ip.get(ip)
             if server:
                 return server['id'], False
             
             new_server_data = {
-                "id": str(uuid.uuid4())[:8],
+                "id": secrets.token_hex(4),
                 "name": row[4] or f"Server-{ip}",
                 "ip": ip,
                 "ssh_user": row[2],
@@ -1950,17 +2955,16 @@ class FastPanelApp(ctk.CTk):
             }
         else: # existing_fp
             url = row[1]
-            try:
-                ip = url.split("://")[1].split(":")[0]
-            except:
-                raise ValueError("Неверный формат URL")
+            ip = _host_from_url(url)
+            if not ip: raise ValueError("Неверный формат URL")
             
-            server = next((s for s in self.servers if s['ip'] == ip), None)
+            if ip in created: return created[ip], False
+            server = self._servers_by_ip.get(ip)
             if server:
                 return server['id'], False
 
             new_server_data = {
-                "id": str(uuid.uuid4())[:8],
+                "id": secrets.token_hex(4),
                 "name": row[4] or f"Server-{ip}",
                 "ip": ip,
                 "admin_url": url,
@@ -1970,8 +2974,10 @@ class FastPanelApp(ctk.CTk):
                 "ssh_user": "root" # Placeholder
             }
         
-        if self.db.add_server(new_server_data):
-            self.servers.append(new_server_data)
+        # Пишем через общую очередь БД и ждем результата; список и индексы меняет только UI-поток
+        if self._submit_db(self.db.add_server, dict(new_server_data)).result():
+            created[ip] = new_server_data['id']
+            self._post_ui(self._remember_server, new_server_data)
             return new_server_data['id'], True
         else:
             raise Exception(f"Не удалось добавить сервер с IP {ip} в БД")
@@ -1979,13 +2985,13 @@ class FastPanelApp(ctk.CTk):
 
     def _add_or_update_domain(self, domain_name, server_id):
         domain_data = {"server_id": server_id}
-        existing_domain = next((d for d in self.domains if d['domain_name'] == domain_name), None)
+        existing_domain = self._domains_by_name.get(domain_name)
 
         if existing_domain:
-            self.db.update_domain(domain_name, domain_data)
+            self._submit_db(self.db.update_domain, domain_name, domain_data).result()
         else:
             domain_data['domain_name'] = domain_name
-            self.db.add_domain(domain_data)
+            self._submit_db(self.db.add_domain, domain_data).result()
 
     def _show_import_results(self, added_domains, created_servers, errors, import_type):
         self.refresh_data()
@@ -1997,7 +3003,7 @@ class FastPanelApp(ctk.CTk):
         results_dialog.transient(self)
         results_dialog.grab_set()
 
-        ctk.CTkLabel(results_dialog, text="Импорт завершен", font=ctk.CTkFont(size=18, weight="bold")).pack(pady=20)
+        ctk.CTkLabel(results_dialog, text="Импорт завершен", font=_font(size=18, weight="bold")).pack(pady=20)
         ctk.CTkLabel(results_dialog, text=f"Успешно добавлено/обновлено доменов: {added_domains}").pack(pady=5)
         ctk.CTkLabel(results_dialog, text=f"Создано новых серверов: {created_servers}").pack(pady=5)
         ctk.CTkLabel(results_dialog, text=f"Обнаружено ошибок: {errors}").pack(pady=5)
@@ -1,10 +1,73 @@
 """
 Настройка логирования для приложения
 """
+import atexit
 import logging
+import os
+import queue
 import sys
+import time
+from functools import lru_cache
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+_FILE_BUFFER_SIZE = 64 * 1024  # байт буфера записи файла логов
+_FILE_FLUSH_INTERVAL = 1.0  # секунд, не дольше которых записи копятся в буфере (в том числе при простое)
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler с буферизованной записью: на диск пачками,
+    записи уровня ERROR и выше - сразу
+    """
+
+    def _open(self):
+        stream = open(self.baseFilename, self.mode, encoding=self.encoding, errors=getattr(self, "errors", None), buffering=_FILE_BUFFER_SIZE)
+        self._written = os.path.getsize(self.baseFilename)
+        self._flushed_at = time.monotonic()
+        return stream
+
+    def shouldRollover(self, record):
+        # Размер файла считаем сами: seek()/tell() буферизованного потока сбрасывали бы буфер на каждой записи
+        if self.stream is None:
+            self.stream = self._open()
+        # Отформатированную строку запоминаем - emit возьмет ее через format(), не форматируя запись повторно
+        self._formatted = (record, self.format(record))
+        self._record_size = len((self._formatted[1] + self.terminator).encode(self.encoding or "utf-8"))
+        return self.maxBytes > 0 and self._written + self._record_size >= self.maxBytes
+
+    def format(self, record):
+        formatted = getattr(self, "_formatted", None)
+        if formatted is not None and formatted[0] is record: return formatted[1]
+        return super().format(record)
+
+    def emit(self, record):
+        self._force_flush = record.levelno >= logging.ERROR
+        super().emit(record)
+        self._written += self._record_size
+
+    def flush(self, force=False):
+        # StreamHandler вызывает flush после каждой записи - пропускаем, пока буфер не пора сбрасывать
+        if force or getattr(self, "_force_flush", True) or time.monotonic() - self._flushed_at >= _FILE_FLUSH_INTERVAL:
+            super().flush()
+            self._flushed_at = time.monotonic()
+
+
+class FlushingQueueListener(QueueListener):
+    """
+    QueueListener, который сбрасывает буфер файла, если за _FILE_FLUSH_INTERVAL
+    не пришло новых записей: иначе при простое последние строки не попадают на диск
+    """
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=_FILE_FLUSH_INTERVAL)
+            except queue.Empty:
+                if not block: raise
+                for handler in self.handlers:
+                    if isinstance(handler, BufferedRotatingFileHandler):
+                        with handler.lock: handler.flush(force=True)
 
 def setup_logger(
     name: str = "fastpanel_automation",
@@ -13,7 +76,8 @@ def setup_logger(
     console: bool = True
 ) -> logging.Logger:
     """
-    Настройка логгера с выводом в файл и консоль
+    Настройка логгера с выводом в файл и консоль.
+    Запись в обработчики идет в фоновом потоке (QueueHandler + QueueListener)
     
     Args:
         name: Имя логгера
@@ -30,17 +94,20 @@ def setup_logger(
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     
+    handlers = []
+
     # Обработчик для файла
     if log_file:
         log_file.parent.mkdir(parents=True, exist_ok=True)
-        file_handler = RotatingFileHandler(
+        file_handler = BufferedRotatingFileHandler(
             log_file,
             maxBytes=10 * 1024 * 1024,  # 10 MB
             backupCount=5,
-            encoding='utf-8'
+            encoding='utf-8',
+            delay=True  # файл открывается при первой записи (в потоке QueueListener), а не при настройке
         )
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     
     # Обработчик для консоли
     if console:
@@ -50,16 +117,30 @@ def setup_logger(
             '%(levelname)s: %(message)s'
         )
         console_handler.setFormatter(console_formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
+
+    if handlers:
+        # Наши форматы не используют поток и процесс - не собираем их для каждой записи.
+        # Флаги общие для процесса, поэтому меняем их только при настройке фоновой записи, а не при импорте
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+        log_queue = queue.SimpleQueue()
+        listener = FlushingQueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        # Дописываем очередь до закрытия обработчиков в logging.shutdown
+        atexit.register(listener.stop)
+        logger.addHandler(QueueHandler(log_queue))
     
     return logger
 
 # Глобальный логгер приложения
 app_logger = None
 
+@lru_cache(maxsize=128)
 def get_logger(name: str = None) -> logging.Logger:
     """
-    Получить логгер
+    Получить логгер (результат кэшируется по имени)
     
     Args:
         name: Имя модуля/компонента
@@ -78,19 +159,20 @@ def get_logger(name: str = None) -> logging.Logger:
         return logging.getLogger(f"fastpanel_automation.{name}")
     return app_logger
 
-# Удобные функции для быстрого логирования
-def log_info(message: str):
+# Удобные функции для быстрого логирования.
+# Аргументы подставляются в message (%-форматирование) только если запись действительно будет выведена
+def log_info(message: str, *args):
     """Логирование информационного сообщения"""
-    get_logger().info(message)
+    get_logger().info(message, *args)
 
-def log_error(message: str, exc_info: bool = False):
-    """Логирование ошибки"""
-    get_logger().error(message, exc_info=exc_info)
+def log_error(message: str, exc_info: bool = False, *args):
+    """Логирование ошибки (exc_info - вторым позиционным, как и раньше; аргументы форматирования - после него)"""
+    get_logger().error(message, *args, exc_info=exc_info)
 
-def log_warning(message: str):
+def log_warning(message: str, *args):
     """Логирование предупреждения"""
-    get_logger().warning(message)
+    get_logger().warning(message, *args)
 
-def log_debug(message: str):
+def log_debug(message: str, *args):
     """Логирование отладочного сообщения"""
-    get_logger().debug(message)
+    get_logger().debug(message, *args)